@@ -0,0 +1,158 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from fastapi import Request, status
+from core.security import PASSWORD_HASH_THREADS
+
+load_dotenv()
+
+# IP 별 / loginId 별 토큰 버킷 (초당 충전량, 최대 버스트)
+ADMISSION_IP_RATE = float(os.getenv("ADMISSION_IP_RATE", "5"))
+ADMISSION_IP_BURST = float(os.getenv("ADMISSION_IP_BURST", "20"))
+ADMISSION_LOGIN_RATE = float(os.getenv("ADMISSION_LOGIN_RATE", "0.2"))
+ADMISSION_LOGIN_BURST = float(os.getenv("ADMISSION_LOGIN_BURST", "5"))
+# 기억하는 키 수 (넘으면 가장 오래 쓰이지 않은 버킷부터 버린다)
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+# 동시에 실행하는 해시 계산 수와 대기열 길이, 최대 대기 시간(초)
+# 기본값은 코어의 절반 (나머지는 요청 처리와 추론 워커가 쓴다)
+ADMISSION_HASH_CONCURRENCY = int(os.getenv(
+    "ADMISSION_HASH_CONCURRENCY", str(max(1, min(PASSWORD_HASH_THREADS, (os.cpu_count() or 1) // 2)))
+))
+ADMISSION_HASH_QUEUE = int(os.getenv("ADMISSION_HASH_QUEUE", str(2 * ADMISSION_HASH_CONCURRENCY)))
+ADMISSION_HASH_WAIT = float(os.getenv("ADMISSION_HASH_WAIT", "2"))
+# 프록시 뒤에서 실행하는 경우 X-Forwarded-For 의 첫 주소를 클라이언트 IP 로 사용
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0").lower() in ("1", "true", "yes")
+
+# 요청을 받지 않은 경우. retry_after 초 후에 다시 시도하도록 안내한다
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+# 키별 토큰 버킷. 크기가 제한된 OrderedDict 에 (남은 토큰, 마지막 갱신 시각) 을 보관
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, maxsize: int = ADMISSION_MAX_KEYS):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.maxsize = max(1, maxsize)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # 토큰을 하나 쓴다. 받을 수 있으면 0, 아니면 토큰이 생길 때까지 기다려야 하는 시간(초)
+    def acquire(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    # 토큰을 쓰지 않고 기다려야 하는 시간(초)만 계산
+    def peek(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+# 비밀번호 해시 계산을 동시에 limit 개까지만 실행하고, 대기열이 차면 기다리지 않고 거절
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, queue: int, max_wait: float):
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            self.rejected += 1
+            raise AdmissionRejected("Server is busy. Please try again later.", status.HTTP_503_SERVICE_UNAVAILABLE, self.max_wait)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected("Server is busy. Please try again later.", status.HTTP_503_SERVICE_UNAVAILABLE, self.max_wait)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+# /signin, /signup 의 요청 수 제한과 해시 계산 동시 실행 제한
+class AdmissionController:
+    def __init__(self):
+        self.by_ip = TokenBucketLimiter(ADMISSION_IP_RATE, ADMISSION_IP_BURST)
+        self.by_login = TokenBucketLimiter(ADMISSION_LOGIN_RATE, ADMISSION_LOGIN_BURST)
+        self.hashing = ConcurrencyLimiter(ADMISSION_HASH_CONCURRENCY, ADMISSION_HASH_QUEUE, ADMISSION_HASH_WAIT)
+        self.throttled = 0
+
+    # 요청 수 제한을 넘으면 429 로 거절 (해시 계산 전에 호출)
+    # 두 버킷을 모두 확인한 뒤에 토큰을 쓴다 (loginId 버킷에서 거절된 요청이 IP 토큰을 쓰지 않도록)
+    def check(self, request: Request, login_id: str):
+        ip = client_ip(request)
+        login_key = login_id.lower() if login_id else None
+        wait = self.by_ip.peek(ip)
+        if login_key:
+            wait = max(wait, self.by_login.peek(login_key))
+        if not wait:
+            wait = self.by_ip.acquire(ip)
+            if not wait and login_key:
+                wait = self.by_login.acquire(login_key)
+        if wait:
+            self.throttled += 1
+            raise AdmissionRejected("Too many requests. Please try again later.", status.HTTP_429_TOO_MANY_REQUESTS, wait)
+
+    def stats(self) -> dict:
+        return {
+            "throttled": self.throttled,
+            "hashActive": self.hashing.active,
+            "hashWaiting": self.hashing.waiting,
+            "hashRejected": self.hashing.rejected,
+            "trackedIps": len(self.by_ip),
+            "trackedLoginIds": len(self.by_login)
+        }
+
+def client_ip(request: Request) -> str:
+    if ADMISSION_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+admission = AdmissionController()
@@ -0,0 +1,94 @@
+import os
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import Depends, Header, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import LRUCache
+from core.security import decode_access_token, create_access_token
+from core.revocation import is_token_revoked, token_id
+from crud_async import get_user_by_loginId
+from database import get_db
+
+load_dotenv()
+
+# 검증을 마친 토큰을 다시 디코딩하지 않도록 보관하는 캐시 (토큰 만료 시각을 넘기지 않는다)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+_token_cache = LRUCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+# 요청한 사용자. refreshedAccess 는 refresh 토큰으로 새로 발급한 access 토큰
+@dataclass(frozen=True)
+class Principal:
+    userId: int
+    loginId: str
+    refreshedAccess: Optional[str] = None
+
+# 인증 실패. main.py 의 예외 핸들러가 {"errorMessage": message} 로 응답한다
+class AuthError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+# 토큰을 검증하고 사용자 정보를 꺼낸다. uid 클레임이 없는 예전 토큰만 DB 에서 조회
+# 다른 워커에서 로그아웃했을 수 있으므로 캐시에 있는 토큰도 폐기 여부는 매번 확인
+async def resolve_principal(token: str, db: AsyncSession) -> Optional[Principal]:
+    cached = _token_cache.get(token)
+    if cached is not None:
+        principal, jti = cached
+        return None if await is_token_revoked(jti) else principal
+
+    payload = decode_access_token(token)
+    if payload is None or "sub" not in payload:
+        return None
+    jti = token_id(payload, token)
+    if await is_token_revoked(jti):
+        return None
+    user_id = payload.get("uid")
+    if user_id is None:
+        user = await get_user_by_loginId(db, payload["sub"])
+        if user is None:
+            return None
+        user_id = user.userId
+
+    principal = Principal(userId=user_id, loginId=payload["sub"])
+    remaining = payload["exp"] - time.time()
+    if remaining > 0:
+        _token_cache.set(token, (principal, jti), min(TOKEN_CACHE_TTL, remaining))
+    return principal
+
+# access 토큰이 필요한 API 에서 사용
+async def get_current_principal(access: str = Header(None), db: AsyncSession = Depends(get_db)) -> Principal:
+    if not access:
+        raise AuthError(status.HTTP_401_UNAUTHORIZED, "Access token is null.")
+    principal = await resolve_principal(access, db)
+    if principal is None:
+        raise AuthError(status.HTTP_401_UNAUTHORIZED, "Invalid access token")
+    return principal
+
+# access 토큰이 없거나 만료되었으면 refresh 토큰으로 새 access 토큰을 발급
+async def get_principal_with_refresh(
+    access: str = Header(None),
+    refresh: str = Header(None),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    if access:
+        principal = await resolve_principal(access, db)
+        if principal is not None:
+            return principal
+    if not refresh:
+        if not access:
+            raise AuthError(status.HTTP_403_FORBIDDEN, "access 토큰과 refresh 토큰이 없습니다.")
+        raise AuthError(status.HTTP_403_FORBIDDEN, "access 토큰이 만료되었고 refresh 토큰이 없습니다.")
+
+    principal = await resolve_principal(refresh, db)
+    if principal is None:
+        raise AuthError(status.HTTP_403_FORBIDDEN, "refresh 토큰이 유효하지 않습니다.")
+    new_access_token = create_access_token(
+        data={"sub": principal.loginId, "uid": principal.userId}, expires_delta=timedelta(minutes=30)
+    )
+    return Principal(userId=principal.userId, loginId=principal.loginId, refreshedAccess=new_access_token)
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud_async import get_cloth_cache, create_cloth_cache
+from core.model import model_version
+from core.inference import inference_pool
+
+load_dotenv()
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+
+# 크기와 TTL 로 항목을 내보내는 LRU 캐시
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return None if item is None else item[0]
+
+    def __len__(self):
+        return len(self._items)
+
+# 업로드 해시 -> 검출된 옷 종류 캐시 (1단계: 프로세스 메모리, 2단계: DB)
+class ResultCache:
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL):
+        self.memory = LRUCache(maxsize, ttl)
+        self.db_hits = 0
+        self.db_misses = 0
+        self._version = None
+
+    # 추론 워커가 실제로 로드한 가중치 기준. 워커 준비 전에는 None 이고 캐시를 쓰지 않는다
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            self._version = model_version(inference_pool.weights)
+        return self._version
+
+    async def lookup(self, db: AsyncSession, content_hash: str):
+        if self.version is None:
+            return None
+        cloth = self.memory.get(content_hash)
+        if cloth is not None:
+            return cloth
+        cached = await get_cloth_cache(db, content_hash, self.version)
+        if cached is None:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        self.memory.set(content_hash, cached.cloth)
+        return cached.cloth
+
+    async def store(self, db: AsyncSession, content_hash: str, cloth: str):
+        if self.version is None:
+            return
+        self.memory.set(content_hash, cloth)
+        await create_cloth_cache(db, content_hash, self.version, cloth)
+
+    def stats(self) -> dict:
+        lookups = self.memory.hits + self.memory.misses
+        hits = self.memory.hits + self.db_hits
+        return {
+            "modelVersion": self.version,
+            "size": len(self.memory),
+            "memoryHits": self.memory.hits,
+            "dbHits": self.db_hits,
+            "misses": self.db_misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+result_cache = ResultCache()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+load_dotenv()
+
+# 커넥션 풀 설정. 워커 수 x (pool_size + max_overflow) 가 Postgres max_connections 를 넘지 않게 맞춘다
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 스크립트와 백그라운드 작업이 쓰는 동기 엔진은 작게 유지
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "2"))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "2"))
+
+# 커넥션을 받기까지 걸린 시간 히스토그램 구간(초)
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 엔진 하나의 풀 지표
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.wait_sum = 0.0
+        self.buckets = [0] * len(CHECKOUT_BUCKETS)
+        self.timeouts = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_sum += seconds
+            for index, bound in enumerate(CHECKOUT_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[index] += 1
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    # 끊긴 연결과 연결 실패만 센다 (IntegrityError 처럼 쿼리가 거절된 경우는 제외)
+    def observe_error(self, context):
+        if not context.is_disconnect and context.connection is not None:
+            return
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        queue_pool = isinstance(pool, QueuePool)
+        return {
+            "size": pool.size() if queue_pool else 0,
+            "inUse": pool.checkedout() if queue_pool else 0,
+            "idle": pool.checkedin() if queue_pool else 0,
+            "overflow": max(0, pool.overflow()) if queue_pool else 0
+        }
+
+# 풀에서 커넥션을 받는 시간(대기 + 새 연결 + pre-ping) 과 타임아웃을 기록하는 풀 클래스를 만든다
+# dispose() 는 같은 클래스로 풀을 다시 만들기 때문에 지표는 클래스에 묶어 둔다
+def instrumented_pool(base, metrics: PoolMetrics):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except PoolTimeoutError:
+            metrics.observe_timeout()
+            raise
+        metrics.observe_checkout(time.perf_counter() - started)
+        metrics.pool = self
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"connect": connect})
+
+# 드라이버 기본 풀 종류를 유지하면서 계측을 붙이고, QueuePool 계열이면 크기/타임아웃 설정을 적용
+def create_instrumented_engine(create, url: str, metrics: PoolMetrics, pool_size: int, max_overflow: int, **kwargs):
+    base = type(create(url, **kwargs).pool)
+    options = {"poolclass": instrumented_pool(base, metrics), "pool_pre_ping": DB_POOL_PRE_PING}
+    if issubclass(base, QueuePool):
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE
+        )
+    engine = create(url, **options, **kwargs)
+    metrics.pool = engine.pool
+    event.listen(getattr(engine, "sync_engine", engine), "handle_error", metrics.observe_error)
+    return engine
+
+def _line(name: str, labels: dict, value) -> str:
+    label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+    return f"{name}{{{label_text}}} {value}"
+
+# Prometheus 텍스트 형식
+def render_pool_metrics(metrics_list) -> str:
+    lines = []
+    definitions = [
+        ("db_pool_size", "gauge", "Configured number of persistent connections."),
+        ("db_pool_connections_in_use", "gauge", "Connections currently checked out."),
+        ("db_pool_connections_idle", "gauge", "Connections idle in the pool."),
+        ("db_pool_overflow", "gauge", "Connections open beyond pool_size."),
+        ("db_pool_checkout_timeouts_total", "counter", "Checkouts that failed with a pool timeout."),
+        ("db_connection_errors_total", "counter", "Failed connection attempts and dropped connections on this engine.")
+    ]
+    for name, kind, description in definitions:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for metrics in metrics_list:
+            snapshot = metrics.snapshot()
+            value = {
+                "db_pool_size": snapshot["size"],
+                "db_pool_connections_in_use": snapshot["inUse"],
+                "db_pool_connections_idle": snapshot["idle"],
+                "db_pool_overflow": snapshot["overflow"],
+                "db_pool_checkout_timeouts_total": metrics.timeouts,
+                "db_connection_errors_total": metrics.errors
+            }[name]
+            lines.append(_line(name, {"engine": metrics.name}, value))
+
+    lines.append("# HELP db_pool_checkout_seconds Time spent getting a connection from the pool.")
+    lines.append("# TYPE db_pool_checkout_seconds histogram")
+    for metrics in metrics_list:
+        with metrics._lock:
+            buckets = list(metrics.buckets)
+            count, total = metrics.checkouts, metrics.wait_sum
+        for bound, value in zip(CHECKOUT_BUCKETS, buckets):
+            lines.append(_line("db_pool_checkout_seconds_bucket", {"engine": metrics.name, "le": bound}, value))
+        lines.append(_line("db_pool_checkout_seconds_bucket", {"engine": metrics.name, "le": "+Inf"}, count))
+        lines.append(_line("db_pool_checkout_seconds_sum", {"engine": metrics.name}, round(total, 6)))
+        lines.append(_line("db_pool_checkout_seconds_count", {"engine": metrics.name}, count))
+    return "\n".join(lines) + "\n"
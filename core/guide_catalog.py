@@ -0,0 +1,69 @@
+import logging
+from dataclasses import dataclass
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud_async import get_reform_guides, get_or_create_reform_guide
+from schemas import ReformCreate
+
+# 업로드로 만드는 리폼 가이드 종류
+DEFAULT_REFORM_TYPE = "example_reform_type"
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ReformGuideEntry:
+    guideId: int
+    reformType: str
+    cloth: str
+    disabilityProfile: str
+
+# 리폼 가이드 카탈로그의 프로세스 메모리 사본
+# 시작할 때 전체를 읽어 두고, 없는 키만 DB 에서 찾거나 추가한 뒤 사본에 반영한다
+# 다른 워커가 추가한 항목은 처음 찾을 때 DB 에서 읽어 온다 (카탈로그 행은 지우지 않는다)
+# profile 이 빈 문자열인 항목은 모든 사용자에게 쓰는 가이드
+class ReformGuideCatalog:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    async def load(self, db: AsyncSession):
+        entries = {}
+        for reform in await get_reform_guides(db):
+            entry = self._entry(reform)
+            entries[(entry.reformType, entry.cloth, entry.disabilityProfile)] = entry
+        self._entries = entries
+        logger.info(f"Loaded {len(entries)} reform guides into the catalog cache")
+
+    def get(self, reform_type: str, cloth: str, profile: str = ""):
+        return self._entries.get((reform_type, cloth, profile))
+
+    async def resolve(self, db: AsyncSession, reform_type: str, cloth: str, profile: str = "") -> ReformGuideEntry:
+        entry = self.get(reform_type, cloth, profile)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        reform = await get_or_create_reform_guide(
+            db, ReformCreate(reformType=reform_type, cloth=cloth, disabilityProfile=profile)
+        )
+        entry = self._entry(reform)
+        self._entries[(reform_type, cloth, profile)] = entry
+        return entry
+
+    @staticmethod
+    def _entry(reform) -> ReformGuideEntry:
+        return ReformGuideEntry(
+            guideId=reform.guideId,
+            reformType=reform.reformType,
+            cloth=reform.cloth,
+            disabilityProfile=reform.disabilityProfile
+        )
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+guide_catalog = ReformGuideCatalog()
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 배치 크기와 최대 대기 시간(ms)
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+# 추론 워커 프로세스 수와 워커당 torch 스레드 수
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# true 이면 앱 시작 시가 아니라 첫 추론 요청에서 워커를 띄운다
+INFERENCE_LAZY = os.getenv("INFERENCE_LAZY", "false").lower() == "true"
+# 배치 하나의 추론을 기다리는 최대 시간(초). 넘으면 배치의 요청을 실패시키고 다음 배치를 보낸다
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+# 워커 프로세스마다 한 번만 로드되는 모델
+_model = None
+
+# 모델 로드 후 합성 이미지로 한 번 추론해 두고 준비된 워커 수를 올린다
+def _init_worker(threads: int, weights: str, ready_workers, failed_workers):
+    global _model
+    logging.basicConfig(level=logging.INFO)
+    try:
+        from core.model import load_model, warmup
+        if weights != "stub":
+            import torch
+            torch.set_num_threads(threads)
+        _model = load_model(weights)
+        warmup(_model)
+    except Exception as e:
+        # 초기화 예외를 다시 던지면 Pool 이 워커를 계속 재시작하므로 기록만 한다
+        logger.error(f"Error occurred while loading the model in inference worker: {e}")
+        with failed_workers.get_lock():
+            failed_workers.value += 1
+        return
+    with ready_workers.get_lock():
+        ready_workers.value += 1
+
+def _prepare_model():
+    logging.basicConfig(level=logging.INFO)
+    from core.model import prepare_model
+    return prepare_model()
+
+# 공유 메모리의 해제(unlink)와 resource tracker 등록은 API 프로세스가 담당하므로 워커는 추적하지 않고 연결만 한다
+# spawn 워커는 API 프로세스의 resource tracker 를 같이 쓰기 때문에 워커에서 등록을 해제하면
+# API 프로세스의 등록까지 지워져 unlink 시 KeyError 가 난다
+def _attach_shared(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 이전에는 track 인자가 없다. 이미 등록된 이름이 같은 tracker 에 다시 등록될 뿐이다
+        return SharedMemory(name=name)
+
+def _worker_predict(blocks):
+    from core.model import predict_batch
+    if _model is None:
+        raise RuntimeError("Model is not loaded in this inference worker.")
+    shms = []
+    images = []
+    try:
+        for name, shape, dtype in blocks:
+            shm = _attach_shared(name)
+            shms.append(shm)
+            images.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+        return predict_batch(_model, images)
+    finally:
+        del images
+        for shm in shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+def _to_shared(array: np.ndarray):
+    shm = SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def _resolve(future, result=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+# 추론 워커가 아직 준비되지 않은 경우
+class InferenceNotReady(Exception):
+    pass
+
+# 모델을 로드한 워커 프로세스 풀. 이미지는 공유 메모리로 전달한다
+class InferencePool:
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads: int = INFERENCE_THREADS):
+        self.workers = max(1, workers)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.weights = None
+        self.error = None
+        self._pool = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._ready_workers = self._context.Value("i", 0)
+        self._failed_workers = self._context.Value("i", 0)
+
+    def start(self):
+        if self._pool is not None:
+            return
+        try:
+            # 모델 변환과 검증은 별도 프로세스에서 한 번만 수행 (API 프로세스에 torch 를 올리지 않는다)
+            with self._context.Pool(1) as setup:
+                self.weights = setup.apply(_prepare_model)
+            self._pool = self._context.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.threads, self.weights, self._ready_workers, self._failed_workers)
+            )
+        except Exception as e:
+            logger.error(f"Error occurred while starting inference workers: {e}")
+            self.error = str(e)
+            return
+        logger.info(f"Started {self.workers} inference workers with {self.threads} threads each using {self.weights}")
+
+    # API 가 바로 요청을 받을 수 있도록 워커 준비는 백그라운드 스레드에서 진행
+    def start_background(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.start, name="inference-start", daemon=True)
+                self._thread.start()
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    @property
+    def ready(self) -> bool:
+        return self._pool is not None and self._ready_workers.value >= self.workers
+
+    def status(self) -> dict:
+        if self.error is not None or self._failed_workers.value > 0:
+            state = "failed"
+        elif self.ready:
+            state = "ready"
+        elif self._thread is None and self._pool is None:
+            state = "stopped"
+        else:
+            state = "starting"
+        return {
+            "status": state,
+            "workers": self.workers,
+            "readyWorkers": self._ready_workers.value,
+            "failedWorkers": self._failed_workers.value,
+            "weights": self.weights
+        }
+
+    async def predict_batch(self, images):
+        if self._pool is None:
+            # INFERENCE_LAZY 인 경우 첫 추론 요청에서 워커를 띄운다
+            self.start_background()
+            raise InferenceNotReady("Inference workers are starting.")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        shared = [_to_shared(image) for image in images]
+        try:
+            self._pool.apply_async(
+                _worker_predict,
+                ([block for _, block in shared],),
+                callback=lambda result: loop.call_soon_threadsafe(_resolve, future, result),
+                error_callback=lambda e: loop.call_soon_threadsafe(_resolve, future, None, e)
+            )
+            # 시간이 지나면 TimeoutError 로 배치를 실패시킨다 (워커에서 진행 중인 작업은 끝날 때까지 둔다)
+            try:
+                return await asyncio.wait_for(future, INFERENCE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"Batch inference timed out after {INFERENCE_TIMEOUT}s") from None
+        finally:
+            for shm, _ in shared:
+                shm.close()
+                shm.unlink()
+
+# 동시에 들어온 요청의 이미지를 모아 predict 한 번으로 처리하는 스케줄러
+class BatchScheduler:
+    def __init__(
+        self,
+        predict_batch,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+        max_concurrency: int = 1
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrency = max(1, max_concurrency)
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._tasks = set()
+
+    async def submit(self, image):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.create_task(self._run())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # 이미 대기 중인 요청은 기다리지 않고 바로 합친다
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 대기 중에 취소된 요청은 배치에서 제외
+        return [(image, future) for image, future in batch if not future.done()]
+
+    async def _run(self):
+        while True:
+            # 빈 워커가 생길 때까지 다음 배치를 모으지 않는다
+            await self._slots.acquire()
+            batch = await self._collect()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        images = [image for image, _ in batch]
+        try:
+            results = await self.predict_batch(images)
+        except Exception as e:
+            logger.error(f"Error occurred during batch inference: {e}")
+            for _, future in batch:
+                _resolve(future, error=e)
+            return
+        finally:
+            self._slots.release()
+        logger.debug(f"Ran batch inference on {len(images)} images")
+        for (_, future), result in zip(batch, results):
+            _resolve(future, result)
+
+inference_pool = InferencePool()
+scheduler = BatchScheduler(
+    inference_pool.predict_batch,
+    max_concurrency=inference_pool.workers
+)
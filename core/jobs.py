@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+# 작업 상태 저장소: memory(프로세스 내부) | sqlite(같은 호스트의 워커끼리 공유)
+JOB_STORE = os.getenv("JOB_STORE", "memory").lower()
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# 끝난 작업의 결과를 보관하는 시간(초)
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+# 서버 종료로 끝나지 못한 작업의 결과
+SHUTDOWN_RESULT = {"errorMessage": "Server is shutting down.", "statusCode": 503}
+
+logger = logging.getLogger(__name__)
+
+# 작업 실패. 상태 조회 시 message 와 status_code 를 그대로 돌려준다
+class JobFailed(Exception):
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+# 큐가 가득 찬 경우
+class JobQueueFull(Exception):
+    pass
+
+class MemoryJobStore:
+    # 호출이 이벤트 루프를 막지 않으므로 바로 호출한다
+    blocking = False
+
+    def __init__(self, ttl: float = JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, user_id: int):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, job in self._jobs.items() if job["status"] in FINISHED and job["updatedAt"] < now - self.ttl]
+            for key in expired:
+                del self._jobs[key]
+            self._jobs[job_id] = {"jobId": job_id, "userId": user_id, "status": QUEUED, "result": None, "updatedAt": now}
+
+    def update(self, job_id: str, status: str, result: dict = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, updatedAt=time.time())
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+class SQLiteJobStore:
+    # 호출마다 파일을 열고 잠금을 기다릴 수 있으므로 스레드풀에서 실행한다
+    blocking = True
+
+    def __init__(self, path: str = JOB_DB_PATH, ttl: float = JOB_TTL):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS job ("
+                "jobId TEXT PRIMARY KEY, userId INTEGER NOT NULL, status TEXT NOT NULL, "
+                "result TEXT, updatedAt REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create(self, job_id: str, user_id: int):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM job WHERE status IN (?, ?) AND updatedAt < ?",
+                (SUCCEEDED, FAILED, now - self.ttl)
+            )
+            connection.execute(
+                "INSERT INTO job (jobId, userId, status, result, updatedAt) VALUES (?, ?, ?, NULL, ?)",
+                (job_id, user_id, QUEUED, now)
+            )
+
+    def update(self, job_id: str, status: str, result: dict = None):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE job SET status = ?, result = ?, updatedAt = ? WHERE jobId = ?",
+                (status, json.dumps(result) if result is not None else None, time.time(), job_id)
+            )
+
+    def get(self, job_id: str):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT jobId, userId, status, result, updatedAt FROM job WHERE jobId = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "jobId": row[0],
+            "userId": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "updatedAt": row[4]
+        }
+
+# 프로세스 내부 asyncio 큐와 워커 태스크로 작업을 실행
+class JobQueue:
+    def __init__(self, store, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_SIZE):
+        self.store = store
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self._queue = None
+        self._tasks = []
+        # 이 프로세스의 워커가 실행 중인 작업 id (종료 시 실패로 기록)
+        self._running = set()
+
+    def _ensure_workers(self):
+        if self._queue is None or all(task.done() for task in self._tasks):
+            self._queue = asyncio.Queue(self.maxsize)
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    # 저장소 호출. 파일이나 DB 를 쓰는 저장소는 이벤트 루프를 막지 않도록 스레드풀에서 실행
+    async def _store(self, method: str, *args):
+        call = getattr(self.store, method)
+        if self.store.blocking:
+            return await run_in_threadpool(call, *args)
+        return call(*args)
+
+    async def get(self, job_id: str):
+        return await self._store("get", job_id)
+
+    # discard 는 작업이 실행되지 못하고 버려질 때 (종료 시 대기 중인 작업) 호출한다
+    async def submit(self, user_id: int, handler, *args, discard=None) -> str:
+        self._ensure_workers()
+        if self._queue.full():
+            raise JobQueueFull("Job queue is full.")
+        job_id = uuid.uuid4().hex
+        await self._store("create", job_id, user_id)
+        try:
+            self._queue.put_nowait((job_id, handler, args, discard))
+        except asyncio.QueueFull:
+            # 저장소에 기록하는 동안 다른 요청이 큐를 채운 경우
+            await self._store("update", job_id, FAILED, {"errorMessage": "Job queue is full.", "statusCode": 503})
+            raise JobQueueFull("Job queue is full.")
+        return job_id
+
+    async def _work(self):
+        while True:
+            job_id, handler, args, _ = await self._queue.get()
+            self._running.add(job_id)
+            try:
+                await self._store("update", job_id, RUNNING)
+                result = await handler(*args)
+                await self._store("update", job_id, SUCCEEDED, result)
+            except JobFailed as e:
+                await self._store("update", job_id, FAILED, {"errorMessage": e.message, "statusCode": e.status_code})
+            except Exception as e:
+                logger.error(f"Error occurred while running job {job_id}: {e}")
+                await self._store("update", job_id, FAILED, {"errorMessage": "Server error.", "statusCode": 500})
+            finally:
+                self._running.discard(job_id)
+
+    # 실행 중인 작업은 취소하고 (업로드 파일은 작업이 직접 정리한다) 대기 중인 작업과 함께 실패로 기록한다
+    # 대기 중인 작업은 실행되지 않으므로 discard 를 호출한다
+    # 기록하지 않으면 sqlite 저장소의 행이 running 으로 남아 다른 워커의 조회와 구독이 끝나지 않는다
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        jobs = [(job_id, None) for job_id in self._running]
+        self._running = set()
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            job_id, _, _, discard = queue.get_nowait()
+            jobs.append((job_id, discard))
+        for job_id, discard in jobs:
+            try:
+                self.store.update(job_id, FAILED, SHUTDOWN_RESULT)
+                if discard is not None:
+                    discard()
+            except Exception as e:
+                logger.error(f"Error occurred while discarding job {job_id}: {e}")
+
+    # 상태가 바뀔 때마다 작업 정보를 내보낸다 (다른 워커가 실행 중인 작업도 저장소를 통해 따라간다)
+    # 변화 없이 heartbeat 초가 지나면 연결 유지를 위해 None 을 내보낸다
+    async def watch(self, job_id: str, interval: float = 0.5, heartbeat: float = 15.0):
+        last = None
+        idle = 0.0
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if last is None or (job["status"], job["updatedAt"]) != last:
+                last = (job["status"], job["updatedAt"])
+                idle = 0.0
+                yield job
+            elif idle >= heartbeat:
+                idle = 0.0
+                yield None
+            if job["status"] in FINISHED:
+                return
+            await asyncio.sleep(interval)
+            idle += interval
+
+job_queue = JobQueue(SQLiteJobStore() if JOB_STORE == "sqlite" else MemoryJobStore())
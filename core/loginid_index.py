@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from crud import get_login_ids_after
+from database import SessionLocal
+
+load_dotenv()
+
+# 예상 사용자 수와 허용하는 오탐률. 사용자 수가 capacity 를 넘으면 두 배 크기로 다시 만든다
+LOGINID_INDEX_CAPACITY = int(os.getenv("LOGINID_INDEX_CAPACITY", "100000"))
+LOGINID_INDEX_ERROR_RATE = float(os.getenv("LOGINID_INDEX_ERROR_RATE", "0.01"))
+# 다른 워커 프로세스에서 가입한 사용자를 가져오는 주기(초)
+LOGINID_INDEX_SYNC_INTERVAL = float(os.getenv("LOGINID_INDEX_SYNC_INTERVAL", "30"))
+LOGINID_INDEX_BATCH_SIZE = 5000
+# 커밋 순서가 userId 순서와 다를 수 있으므로 마지막 userId 보다 조금 앞부터 다시 읽는다
+LOGINID_INDEX_SYNC_OVERLAP = 100
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value: str, count: bool = True):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        if count:
+            self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+# 사용 중인 loginId 의 Bloom filter. 없다고 답하면 확실히 없는 것이고, 있다고 답하면 DB 로 확인해야 한다
+# 사용자 삭제는 반영하지 않는다 (지워진 loginId 는 DB 확인에서 걸러진다)
+class LoginIdIndex:
+    def __init__(self, capacity: int = LOGINID_INDEX_CAPACITY, error_rate: float = LOGINID_INDEX_ERROR_RATE):
+        self.error_rate = error_rate
+        self.ready = False
+        self.db_checks = 0
+        self.false_positives = 0
+        self._filter = BloomFilter(capacity, error_rate)
+        self._watermark = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._task = None
+
+    # 준비 전이거나 있을 수도 있으면 True (호출한 쪽이 DB 로 확인한다)
+    def might_exist(self, login_id: str) -> bool:
+        if not self.ready:
+            return True
+        with self._lock:
+            return login_id in self._filter
+
+    # 이 프로세스에서 가입한 loginId 를 바로 반영 (개수는 다음 동기화 때 DB 기준으로 센다)
+    def add(self, login_id: str):
+        with self._lock:
+            self._filter.add(login_id, count=False)
+            if self._pending is not None:
+                self._pending.append(login_id)
+
+    # DB 확인 결과를 기록 (오탐률 확인용)
+    def record_check(self, exists: bool):
+        self.db_checks += 1
+        if not exists:
+            self.false_positives += 1
+
+    # after_user_id 이후의 loginId 를 필터에 넣고 마지막 userId 를 반환. known_user_id 이하는 이미 센 항목
+    # 사용 중인 필터에는 add() 가 동시에 비트를 쓰므로 묶음마다 잠금을 잡고 넣는다 (DB 조회는 잠금 밖에서)
+    def _load(self, db: Session, bloom: BloomFilter, after_user_id: int, known_user_id: int = 0) -> int:
+        while True:
+            rows = get_login_ids_after(db, after_user_id, LOGINID_INDEX_BATCH_SIZE)
+            with self._lock:
+                for user_id, login_id in rows:
+                    bloom.add(login_id, count=user_id > known_user_id)
+                    after_user_id = max(after_user_id, user_id)
+            if len(rows) < LOGINID_INDEX_BATCH_SIZE:
+                return after_user_id
+
+    # user 테이블 전체로 새 필터를 만든다. 만드는 동안 가입한 loginId 는 따로 모아 두었다가 반영
+    def rebuild(self, capacity: int = None):
+        with self._lock:
+            capacity = capacity or self._filter.capacity
+            self._pending = []
+        bloom = BloomFilter(capacity, self.error_rate)
+        db = SessionLocal()
+        try:
+            watermark = self._load(db, bloom, 0)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            for login_id in self._pending:
+                bloom.add(login_id, count=False)
+            self._pending = None
+            self._filter = bloom
+            self._watermark = watermark
+        self.ready = True
+        logger.info(f"Login id index loaded {bloom.count} ids (capacity {bloom.capacity})")
+
+    # 마지막으로 읽은 userId 이후에 가입한 사용자를 추가
+    def sync(self):
+        if self._filter.count > self._filter.capacity:
+            self.rebuild(self._filter.capacity * 2)
+            return
+        db = SessionLocal()
+        try:
+            with self._lock:
+                bloom = self._filter
+            watermark = self._load(db, bloom, max(0, self._watermark - LOGINID_INDEX_SYNC_OVERLAP), self._watermark)
+        finally:
+            db.close()
+        with self._lock:
+            if bloom is self._filter:
+                self._watermark = max(self._watermark, watermark)
+
+    async def _run(self, interval: float):
+        while True:
+            try:
+                if self.ready:
+                    await run_in_threadpool(self.sync)
+                else:
+                    await run_in_threadpool(self.rebuild)
+            except Exception as e:
+                logger.error(f"Error occurred while loading the login id index: {e}")
+            await asyncio.sleep(interval)
+
+    # 앱 시작 시 백그라운드에서 채우고 주기적으로 동기화
+    def start(self, interval: float = LOGINID_INDEX_SYNC_INTERVAL):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "count": self._filter.count,
+            "capacity": self._filter.capacity,
+            "dbChecks": self.db_checks,
+            "falsePositives": self.false_positives
+        }
+
+login_id_index = LoginIdIndex()
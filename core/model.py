@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_PATH = os.getenv("MODEL_PATH", "./routers/best.pt")
+# 추론 런타임: torch(기본) | onnx | openvino | stub(벤치마크용)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+INFERENCE_INT8 = os.getenv("INFERENCE_INT8", "false").lower() == "true"
+INFERENCE_IMGSZ = int(os.getenv("INFERENCE_IMGSZ", "640"))
+# openvino INT8 보정에 쓰는 데이터셋 yaml (지정하지 않으면 ultralytics 기본값)
+INFERENCE_INT8_DATA = os.getenv("INFERENCE_INT8_DATA")
+# 변환된 모델을 저장해 두는 디렉토리
+MODEL_EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", "./routers/exported")
+# 변환된 모델과 torch 모델의 검출 결과 비교 기준
+PARITY_IMAGE = os.getenv("INFERENCE_PARITY_IMAGE", "./images/test_cloth.png")
+PARITY_TOLERANCE = float(os.getenv("INFERENCE_PARITY_TOLERANCE", "0.1"))
+
+BACKENDS = ("torch", "onnx", "openvino", "stub")
+
+logger = logging.getLogger(__name__)
+
+# 벤치마크용 모델. 고정된 결과를 정해진 지연 시간 후에 돌려준다
+class StubModel:
+    names = {0: os.getenv("INFERENCE_STUB_CLOTH", "shirt")}
+
+    def __init__(self, latency_ms: float = float(os.getenv("INFERENCE_STUB_LATENCY_MS", "20"))):
+        self.latency = latency_ms / 1000
+
+    # ultralytics 결과에서 predict_batch 가 쓰는 부분(boxes.data.cpu().numpy())만 흉내 낸다
+    class _Tensor:
+        def __init__(self, array):
+            self.array = array
+
+        def cpu(self):
+            return self
+
+        def numpy(self):
+            return self.array
+
+    def predict(self, images, **kwargs):
+        import numpy as np
+        time.sleep(self.latency)
+        images = images if isinstance(images, list) else [images]
+        box = np.array([[0, 0, 1, 1, 0.99, 0]], dtype=np.float32)
+        return [SimpleNamespace(boxes=SimpleNamespace(data=self._Tensor(box))) for _ in images]
+
+# 모델 로드 (.pt 가 아니면 변환된 모델로 간주)
+def load_model(weights: str = MODEL_PATH):
+    if weights == "stub":
+        return StubModel()
+    from ultralytics import YOLO
+    if not weights.endswith(".pt"):
+        return YOLO(weights, task="detect")
+    import torch
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return YOLO(weights).to(device)
+
+# 이미지 묶음을 한 번에 추론하고 이미지별 (클래스명, 신뢰도) 목록을 반환
+def predict_batch(model, images):
+    results = model.predict(images, imgsz=INFERENCE_IMGSZ, verbose=False)
+    detections = []
+    for result in results:
+        boxes = result.boxes.data.cpu().numpy()
+        detections.append([(model.names[int(box[5])], float(box[4])) for box in boxes])
+    return detections
+
+# 첫 요청이 지연되지 않도록 합성 이미지로 한 번 추론해 둔다
+def warmup(model):
+    import numpy as np
+    image = np.zeros((INFERENCE_IMGSZ, INFERENCE_IMGSZ, 3), dtype=np.uint8)
+    predict_batch(model, [image])
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+# 캐시 키에 쓰이는 모델 버전. 지정하지 않으면 prepare_model() 이 반환한 가중치의 해시와 런타임을 사용
+# (변환이나 검증에 실패해 torch 로 대체된 경우 torch 버전). 가중치가 아직 정해지지 않았으면 None
+def model_version(weights: str) -> str:
+    version = os.getenv("MODEL_VERSION")
+    if version:
+        return version
+    if weights is None:
+        return None
+    if weights == "stub":
+        return "stub"
+    try:
+        digest = _file_digest(MODEL_PATH)
+    except OSError:
+        return "unknown"
+    if weights == MODEL_PATH:
+        return digest
+    # 변환된 모델 이름: best.onnx, best-int8.onnx, best_openvino_model, best_int8_openvino_model
+    name = os.path.basename(os.path.normpath(weights))
+    runtime = "onnx" if name.endswith(".onnx") else "openvino"
+    return f"{digest}-{runtime}{'-int8' if 'int8' in name else ''}"
+
+# best.pt 를 onnx/openvino 로 한 번만 변환하고 결과물 경로를 반환
+def export_model(backend: str = INFERENCE_BACKEND, int8: bool = INFERENCE_INT8) -> str:
+    if backend not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported inference backend: {backend}")
+    name = os.path.splitext(os.path.basename(MODEL_PATH))[0]
+    export_dir = os.path.join(MODEL_EXPORT_DIR, _file_digest(MODEL_PATH))
+    if backend == "onnx":
+        onnx_path = os.path.join(export_dir, f"{name}.onnx")
+        target = os.path.join(export_dir, f"{name}-int8.onnx") if int8 else onnx_path
+    else:
+        target = os.path.join(export_dir, f"{name}{'_int8' if int8 else ''}_openvino_model")
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+    os.makedirs(export_dir, exist_ok=True)
+    # 결과물이 가중치 옆에 생성되므로 캐시 디렉토리에 복사해 두고 변환한다
+    weights = os.path.join(export_dir, os.path.basename(MODEL_PATH))
+    if not os.path.exists(weights):
+        shutil.copyfile(MODEL_PATH, weights)
+    logger.info(f"Exporting {MODEL_PATH} to {backend}{' (int8)' if int8 else ''}")
+    if backend == "onnx":
+        if not os.path.exists(onnx_path):
+            YOLO(weights).export(format="onnx", imgsz=INFERENCE_IMGSZ, dynamic=True)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(onnx_path, target, weight_type=QuantType.QUInt8)
+    else:
+        options = {"data": INFERENCE_INT8_DATA} if int8 and INFERENCE_INT8_DATA else {}
+        YOLO(weights).export(format="openvino", imgsz=INFERENCE_IMGSZ, dynamic=True, int8=int8, **options)
+    if not os.path.exists(target):
+        raise RuntimeError(f"Exported model not found at {target}")
+    return target
+
+def _iou(a, b) -> float:
+    width = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+# 변환된 모델이 torch 모델과 같은 물체를 허용 오차 안에서 검출하는지 확인
+def check_parity(weights: str, tolerance: float = PARITY_TOLERANCE) -> bool:
+    reference = load_model(MODEL_PATH).predict(PARITY_IMAGE, imgsz=INFERENCE_IMGSZ, verbose=False)[0]
+    candidate = load_model(weights).predict(PARITY_IMAGE, imgsz=INFERENCE_IMGSZ, verbose=False)[0]
+    expected = reference.boxes.data.cpu().numpy()
+    actual = candidate.boxes.data.cpu().numpy()
+    if len(expected) != len(actual):
+        logger.warning(f"Parity check failed: {len(expected)} detections with torch, {len(actual)} with {weights}")
+        return False
+    unmatched = list(actual)
+    for box in expected:
+        match = next((
+            other for other in unmatched
+            if int(other[5]) == int(box[5])
+            and abs(float(other[4]) - float(box[4])) <= tolerance
+            and _iou(box[:4], other[:4]) >= 1 - tolerance
+        ), None)
+        if match is None:
+            logger.warning(f"Parity check failed: no match for class {int(box[5])} in {weights}")
+            return False
+        unmatched = [other for other in unmatched if other is not match]
+    return True
+
+# 설정된 런타임의 모델을 준비하고 워커가 로드할 가중치 경로를 반환
+# 변환이나 검증에 실패하면 torch 모델로 대체한다
+def prepare_model() -> str:
+    if INFERENCE_BACKEND == "stub":
+        return "stub"
+    if INFERENCE_BACKEND == "torch":
+        return MODEL_PATH
+    try:
+        weights = export_model()
+    except Exception as e:
+        logger.error(f"Error occurred while exporting the model to {INFERENCE_BACKEND}: {e}")
+        return MODEL_PATH
+    try:
+        if not check_parity(weights):
+            logger.warning(f"{INFERENCE_BACKEND} detections differ from torch, falling back to torch")
+            return MODEL_PATH
+    except Exception as e:
+        logger.error(f"Error occurred while checking {INFERENCE_BACKEND} model parity: {e}")
+        return MODEL_PATH
+    logger.info(f"Using {INFERENCE_BACKEND} model at {weights}")
+    return weights
@@ -0,0 +1,110 @@
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+load_dotenv()
+
+# 현재 달 이후로 미리 만들어 둘 log 월별 파티션 수
+LOG_PARTITIONS_AHEAD = int(os.getenv("LOG_PARTITIONS_AHEAD", "3"))
+# 해당 월의 파티션이 없을 때 행이 들어가는 기본 파티션 (0004 마이그레이션에서 만든다)
+LOG_DEFAULT_PARTITION = "log_default"
+
+LOG_PARTITION_PATTERN = re.compile(r"^log_y(\d{4})m(\d{2})$")
+
+logger = logging.getLogger(__name__)
+
+# log 는 Postgres 에서만 파티션 테이블이다. 다른 DB 는 createdAt 인덱스로 범위 삭제한다
+def supports_partitions(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+# 해당 시각이 속한 달의 1일 0시 (UTC)
+def month_start(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def log_partition_name(month: datetime) -> str:
+    return f"log_y{month.year:04d}m{month.month:02d}"
+
+# 파티션 이름에서 달을 읽는다. 월별 파티션이 아니면 None
+def log_partition_month(name: str):
+    match = LOG_PARTITION_PATTERN.match(name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+def is_log_partition(name: str) -> bool:
+    return name == LOG_DEFAULT_PARTITION or log_partition_month(name) is not None
+
+# [month, 다음 달) 범위의 파티션을 만든다 (이미 있으면 그대로 둔다)
+def create_log_partition(connection: Connection, month: datetime):
+    start, end = month, add_months(month, 1)
+    connection.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{log_partition_name(month)}" PARTITION OF log '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+# 기본 파티션에 [month, 다음 달) 범위의 행이 있는지 (있으면 Postgres 가 그 달의 파티션 생성을 거부한다)
+def default_partition_has_rows(connection: Connection, month: datetime) -> bool:
+    return connection.execute(text(
+        f'SELECT 1 FROM "{LOG_DEFAULT_PARTITION}" WHERE "createdAt" >= :start AND "createdAt" < :end LIMIT 1'
+    ), {"start": month, "end": add_months(month, 1)}).first() is not None
+
+# 이번 달부터 ahead 개월 뒤까지의 파티션을 준비. 만든 파티션 이름 목록을 반환
+# 달마다 savepoint 안에서 만들어 한 달이 실패해도 나머지 달은 만든다
+# 기본 파티션에 이미 행이 쌓인 달은 건너뛴다 (그 행들은 그대로 기본 파티션에 남고, 보관 기간이 지나면 retention 이 지운다)
+def ensure_log_partitions(connection: Connection, ahead: int = LOG_PARTITIONS_AHEAD, now: datetime = None):
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = {name for _, name in list_log_partitions(connection)}
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        name = log_partition_name(month)
+        if name in existing:
+            continue
+        if default_partition_has_rows(connection, month):
+            logger.warning(f"Skipping log partition {name}: {LOG_DEFAULT_PARTITION} already holds rows for {month:%Y-%m}")
+            continue
+        try:
+            with connection.begin_nested():
+                create_log_partition(connection, month)
+        except Exception as e:
+            logger.warning(f"Error occurred while creating log partition {name}: {e}")
+            continue
+        created.append(name)
+    return created
+
+# 월별 파티션 목록 (달, 이름) 을 오래된 순으로
+def list_log_partitions(connection: Connection):
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = 'log'"
+    )).scalars().all()
+    partitions = [(log_partition_month(name), name) for name in rows]
+    return sorted((month, name) for month, name in partitions if month is not None)
+
+# 파티션을 떼어 낸 뒤 삭제 (행 단위 DELETE 와 달리 인덱스와 테이블이 바로 줄어든다)
+def drop_log_partition(connection: Connection, name: str):
+    connection.execute(text(f'ALTER TABLE log DETACH PARTITION "{name}"'))
+    connection.execute(text(f'DROP TABLE "{name}"'))
+
+# 앱 시작 시 다음 달 파티션이 없어 기본 파티션에 행이 쌓이지 않도록 미리 만든다
+def prepare_log_partitions(engine: Engine):
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as connection:
+            ensure_log_partitions(connection)
+    except Exception as e:
+        logger.warning(f"Error occurred while creating log partitions: {e}")
@@ -0,0 +1,42 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+from core.model import INFERENCE_IMGSZ
+
+load_dotenv()
+
+PREPROCESS_THREADS = int(os.getenv("PREPROCESS_THREADS", "4"))
+
+# 디코딩은 Pillow 가 GIL 을 놓는 구간이 길어 스레드 풀로 충분하다
+_executor = ThreadPoolExecutor(max_workers=PREPROCESS_THREADS, thread_name_prefix="preprocess")
+
+# 이미지로 읽을 수 없는 업로드 (형식을 알 수 없거나 잘린 파일, 너무 큰 이미지)
+class ImageDecodeError(Exception):
+    pass
+
+# 업로드 이미지를 모델 입력 크기로 줄여 YOLO 입력 형식(BGR 배열)으로 디코딩
+def decode_image(source, target_size: int = INFERENCE_IMGSZ) -> np.ndarray:
+    try:
+        return _decode_image(source, target_size)
+    # Pillow 는 손상된 파일에 OSError(UnidentifiedImageError) 외에도 ValueError, SyntaxError, EOFError 를 낸다
+    # (mmap 으로 읽으면 파일 끝을 넘는 seek 가 ValueError)
+    except (OSError, ValueError, SyntaxError, EOFError, Image.DecompressionBombError) as e:
+        raise ImageDecodeError(str(e)) from e
+
+def _decode_image(source, target_size: int) -> np.ndarray:
+    with Image.open(source) as image:
+        # JPEG 는 전체 해상도로 풀지 않고 1/2~1/8 축소 디코딩으로 목표 크기에 가깝게 읽는다
+        if image.format == "JPEG":
+            image.draft("RGB", (target_size, target_size))
+        # 휴대폰 사진의 EXIF 회전 정보 반영
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+        image.thumbnail((target_size, target_size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+async def decode_image_async(source, target_size: int = INFERENCE_IMGSZ) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, decode_image, source, target_size)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from fastapi import Depends
+from sqlalchemy.exc import SQLAlchemyError
+from core.auth import Principal, get_principal_with_refresh
+from core.cache import LRUCache
+from database import AsyncSessionLocal, ReplicaSessionLocal
+
+load_dotenv()
+
+# 쓰기 직후 이 시간(초) 동안은 같은 사용자의 조회를 primary 로 보낸다 (복제 지연보다 길게 설정)
+REPLICA_READ_YOUR_WRITES_WINDOW = float(os.getenv("REPLICA_READ_YOUR_WRITES_WINDOW", "5"))
+REPLICA_WRITE_TRACKING_SIZE = int(os.getenv("REPLICA_WRITE_TRACKING_SIZE", "100000"))
+# 복제본 연결이 연속으로 이만큼 실패하면 REPLICA_RETRY_INTERVAL 초 동안 primary 만 사용
+REPLICA_FAILURE_THRESHOLD = int(os.getenv("REPLICA_FAILURE_THRESHOLD", "3"))
+REPLICA_RETRY_INTERVAL = float(os.getenv("REPLICA_RETRY_INTERVAL", "30"))
+
+logger = logging.getLogger(__name__)
+
+# 조회 세션을 복제본과 primary 중 어디에 열지 정한다
+# 최근 쓰기 기록은 워커 프로세스마다 따로 가진다 (다른 워커에서 쓴 직후의 조회는 복제 지연만큼 늦을 수 있다)
+class ReadRouter:
+    def __init__(self, session_factory=ReplicaSessionLocal):
+        self.session_factory = session_factory
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self._opened_at = None
+        self._recent_writes = LRUCache(REPLICA_WRITE_TRACKING_SIZE, REPLICA_READ_YOUR_WRITES_WINDOW)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.session_factory is not None
+
+    # 연속 실패로 차단된 상태에서도 재시도 간격이 지나면 다시 한 번 복제본을 시도한다
+    @property
+    def available(self) -> bool:
+        opened_at = self._opened_at
+        return opened_at is None or time.monotonic() - opened_at >= REPLICA_RETRY_INTERVAL
+
+    def mark_write(self, user_id: int):
+        if self.enabled and user_id is not None:
+            self._recent_writes.set(user_id, True)
+
+    def use_replica(self, user_id: int = None) -> bool:
+        if not self.enabled or not self.available:
+            return False
+        return user_id is None or self._recent_writes.get(user_id) is None
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Read replica recovered")
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.fallbacks += 1
+            if self.failures >= REPLICA_FAILURE_THRESHOLD:
+                if self._opened_at is None:
+                    logger.warning(f"Read replica disabled for {REPLICA_RETRY_INTERVAL}s: {error}")
+                self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def session(self, user_id: int = None):
+        db = await self._open_replica() if self.use_replica(user_id) else None
+        if db is None:
+            self.primary_reads += 1
+            db = AsyncSessionLocal()
+        else:
+            self.replica_reads += 1
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    # 복제본 커넥션을 미리 받아 본다 (풀의 pre-ping 이 연결 상태를 확인). 실패하면 None
+    async def _open_replica(self):
+        db = self.session_factory()
+        try:
+            await db.connection()
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Read replica unavailable, falling back to primary: {e}")
+            self.record_failure(e)
+            await db.close()
+            return None
+        self.record_success()
+        return db
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "available": self.enabled and self.available,
+            "replicaReads": self.replica_reads,
+            "primaryReads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+            "consecutiveFailures": self.failures
+        }
+
+read_router = ReadRouter()
+
+# 조회 전용 API 의 세션. 복제본이 없거나 사용할 수 없으면 primary 세션
+async def get_read_db():
+    async with read_router.session() as db:
+        yield db
+
+# 로그인한 사용자의 조회 세션. 그 사용자가 방금 쓴 내용은 primary 에서 읽는다
+async def get_user_read_db(principal: Principal = Depends(get_principal_with_refresh)):
+    async with read_router.session(principal.userId) as db:
+        yield db
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+# 폐기한 토큰 저장소: memory(프로세스 내부) | sqlite(같은 호스트의 uvicorn 워커끼리 공유)
+REVOCATION_STORE = os.getenv("REVOCATION_STORE", "sqlite").lower()
+REVOCATION_DB_PATH = os.getenv("REVOCATION_DB_PATH", "revoked_tokens.sqlite3")
+# 만료된 항목을 지우는 주기(초)
+REVOCATION_PURGE_INTERVAL = float(os.getenv("REVOCATION_PURGE_INTERVAL", "60"))
+
+# 토큰 식별자. jti 클레임이 없는 예전 토큰은 토큰 문자열의 해시를 사용
+def token_id(payload: dict, token: str) -> str:
+    return payload.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class MemoryRevocationStore:
+    # 호출이 이벤트 루프를 막지 않으므로 바로 호출한다
+    blocking = False
+
+    def __init__(self, purge_interval: float = REVOCATION_PURGE_INTERVAL):
+        self.purge_interval = purge_interval
+        self._revoked = {}
+        self._purged_at = time.time()
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, exp: float):
+        now = time.time()
+        with self._lock:
+            self._revoked[jti] = exp
+            if now - self._purged_at >= self.purge_interval:
+                self._revoked = {key: value for key, value in self._revoked.items() if value > now}
+                self._purged_at = now
+
+    def is_revoked(self, jti: str) -> bool:
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._revoked)
+
+# 요청마다 확인하므로 스레드별 연결을 재사용하고 jti 기본 키로 조회
+class SQLiteRevocationStore:
+    # 다른 워커의 쓰기 잠금을 최대 5초 기다릴 수 있으므로 스레드풀에서 실행한다
+    blocking = True
+
+    def __init__(self, path: str = REVOCATION_DB_PATH, purge_interval: float = REVOCATION_PURGE_INTERVAL):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._local = threading.local()
+        connection = self._connection()
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS revokedToken (jti TEXT PRIMARY KEY, exp REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_revokedToken_exp ON revokedToken (exp)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            self._local.connection = connection
+        return connection
+
+    def revoke(self, jti: str, exp: float):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO revokedToken (jti, exp) VALUES (?, ?)", (jti, exp))
+            if now - self._purged_at >= self.purge_interval:
+                connection.execute("DELETE FROM revokedToken WHERE exp <= ?", (now,))
+                self._purged_at = now
+
+    def is_revoked(self, jti: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM revokedToken WHERE jti = ? AND exp > ?", (jti, time.time())
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM revokedToken").fetchone()[0]
+
+revocation_store = SQLiteRevocationStore() if REVOCATION_STORE == "sqlite" else MemoryRevocationStore()
+
+# API 에서 쓰는 호출. 파일을 쓰는 저장소는 이벤트 루프를 막지 않도록 스레드풀에서 실행
+async def revoke_token(jti: str, exp: float):
+    if revocation_store.blocking:
+        await run_in_threadpool(revocation_store.revoke, jti, exp)
+    else:
+        revocation_store.revoke(jti, exp)
+
+async def is_token_revoked(jti: str) -> bool:
+    if revocation_store.blocking:
+        return await run_in_threadpool(revocation_store.is_revoked, jti)
+    return revocation_store.is_revoked(jti)
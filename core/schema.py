@@ -0,0 +1,35 @@
+import os
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from dotenv import load_dotenv
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# false 이면 시작 시 스키마 버전을 확인하지 않는다
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "true").lower() in ("1", "true", "yes")
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# DB 스키마가 코드가 기대하는 마이그레이션보다 뒤처진 경우
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def expected_revisions() -> set:
+    return set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+def current_revisions(engine: Engine) -> set:
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+# 앱 시작 시 호출. 인덱스가 빠진 채 느리게 동작하지 않도록 바로 실패한다
+def check_schema(engine: Engine):
+    if not SCHEMA_CHECK:
+        return
+    expected = expected_revisions()
+    current = current_revisions(engine)
+    if current != expected:
+        raise SchemaOutOfDate(
+            f"Database schema is at {sorted(current) or 'no revision'} but the code expects {sorted(expected)}. "
+            "Run `python -m scripts.migrate` (or `alembic upgrade head`) before starting the app."
+        )
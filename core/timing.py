@@ -0,0 +1,22 @@
+import time
+from contextlib import contextmanager
+
+# 요청 처리 단계별 소요 시간을 기록하고 Server-Timing 헤더로 내보낸다
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def as_dict(self) -> dict:
+        return {name: round(duration, 2) for name, duration in self.stages.items()}
+
+    def header(self) -> str:
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in self.stages.items())
@@ -0,0 +1,118 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from dotenv import load_dotenv
+from fastapi import UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+# 업로드 크기 제한(byte)과 허용하는 content-type (쉼표로 구분, "image/*" 형식 허용)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CONTENT_TYPES = [value.strip() for value in os.getenv("UPLOAD_CONTENT_TYPES", "image/*").split(",") if value.strip()]
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 배치 업로드 요청 본문 전체의 크기 제한(byte)
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(UPLOAD_MAX_BYTES * 10)))
+# multipart 경계와 파트 헤더를 위한 여유분
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+UPLOAD_DIR = "images"
+
+# 크기나 형식 때문에 받을 수 없는 업로드
+class UploadRejected(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def _allowed_content_type(content_type: str) -> bool:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    for allowed in UPLOAD_CONTENT_TYPES:
+        if allowed.endswith("/*") and content_type.startswith(allowed[:-1]):
+            return True
+        if content_type == allowed:
+            return True
+    return False
+
+# 임시 파일로 받아 둔 업로드. 저장(persist) 하지 않으면 discard 로 지운다
+class IngestedUpload:
+    def __init__(self, path: str, content_hash: str, size: int, filename: str, content_type: str):
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        self.filename = filename
+        self.content_type = content_type
+        # persist 로 최종 경로에 새 파일을 만든 경우 True (롤백 시 지울 수 있는 파일)
+        self.created = False
+
+    # 파일을 복사하지 않고 디코더에 넘길 수 있는 읽기 전용 메모리 맵
+    def open_view(self) -> mmap.mmap:
+        with open(self.path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # 같은 파일시스템 안에서 이름만 바꿔 최종 경로로 옮긴다
+    def persist(self, destination: str):
+        self.created = not os.path.exists(destination)
+        os.replace(self.path, destination)
+        self.path = destination
+
+    # persist 로 새로 만든 파일을 지운다 (같은 내용의 기존 파일은 남긴다)
+    def remove_created(self):
+        if self.created and os.path.exists(self.path):
+            os.remove(self.path)
+        self.created = False
+
+    def discard(self):
+        if self.path.endswith(".part") and os.path.exists(self.path):
+            os.remove(self.path)
+
+def _copy_to_temp(source, max_bytes: int):
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected("Image is too large.", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+                digest.update(chunk)
+                file.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+# 업로드를 청크 단위로 임시 파일에 쓰면서 해시를 계산하고 크기/형식을 검사
+async def ingest_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> IngestedUpload:
+    if upload is None:
+        raise UploadRejected("image is a required field.", status.HTTP_400_BAD_REQUEST)
+    if not _allowed_content_type(upload.content_type):
+        raise UploadRejected("Unsupported image content type.", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    await upload.seek(0)
+    path, content_hash, size = await run_in_threadpool(_copy_to_temp, upload.file, max_bytes)
+    if size == 0:
+        os.remove(path)
+        raise UploadRejected("Image is empty.", status.HTTP_400_BAD_REQUEST)
+    return IngestedUpload(path, content_hash, size, upload.filename, upload.content_type)
+
+# Content-Length 가 제한을 넘는 업로드 요청은 본문을 받기 전에 413 으로 거절 (경로 -> 제한 byte)
+# Content-Length 가 없는 chunked 요청은 본문을 받은 뒤 ingest_upload 에서 파일별로 검사한다
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"])
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if limit is not None and length.isdigit() and int(length) > limit:
+                response = JSONResponse(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={"errorMessage": "Image is too large."}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
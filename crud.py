@@ -1,8 +1,10 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models import User, Image, Disability, Log, Reform
+from models import User, Image, Disability, Log, Reform, ClothCache, WardrobeStat
 from schemas import UserCreate, ImageCreate, DisabilityCreate, LogCreate, ReformCreate
 
-# Create User
+# Create User: 사용자와 장애 목록을 한 트랜잭션으로 저장 (장애 목록은 한 번의 INSERT)
 def create_user(db: Session, user: UserCreate):
     db_user = User(
         loginId=user.loginId,
@@ -10,14 +12,16 @@ def create_user(db: Session, user: UserCreate):
         username=user.username
     )
     db.add(db_user)
+    db.flush()
+
+    obstacles = list(dict.fromkeys(user.disabilities))
+    if obstacles:
+        db.execute(insert(Disability).values([
+            {"userId": db_user.userId, "obstacle": obstacle} for obstacle in obstacles
+        ]))
     db.commit()
     db.refresh(db_user)
 
-    for obstacle in user.disabilities:
-        db_disability = Disability(userId=db_user.userId, obstacle=obstacle)
-        db.add(db_disability)
-    db.commit()
-    
     return db_user
 
 # Read User
@@ -27,6 +31,22 @@ def get_user(db: Session, user_id: int):
 def get_user_by_loginId(db: Session, loginId: str):
     return db.query(User).filter(User.loginId == loginId).first()
 
+# loginId 사용 여부만 확인 (User 행 전체를 읽지 않고 unique 인덱스만 조회)
+def login_id_exists(db: Session, loginId: str) -> bool:
+    return db.execute(select(User.userId).where(User.loginId == loginId).limit(1)).first() is not None
+
+# userId 가 after_user_id 보다 큰 사용자의 (userId, loginId) 를 userId 순으로 조회
+def get_login_ids_after(db: Session, after_user_id: int, limit: int):
+    return db.execute(
+        select(User.userId, User.loginId).where(User.userId > after_user_id).order_by(User.userId).limit(limit)
+    ).all()
+
+# userId 가 after_user_id 보다 큰 사용자 id 를 userId 순으로 조회
+def get_user_ids_after(db: Session, after_user_id: int, limit: int):
+    return db.execute(
+        select(User.userId).where(User.userId > after_user_id).order_by(User.userId).limit(limit)
+    ).scalars().all()
+
 # Update User
 def update_user_name(db: Session, user_id: int, new_name: str):
     user = db.query(User).filter(User.userId == user_id).first()
@@ -62,6 +82,17 @@ def get_image(db: Session, image_id: int):
 def get_images(db: Session, skip: int = 0, limit: int = 10):
     return db.query(Image).offset(skip).limit(limit).all()
 
+def get_images_by_ids(db: Session, image_ids: list[int]):
+    return db.execute(select(Image).where(Image.imageId.in_(image_ids)).order_by(Image.imageId)).scalars().all()
+
+# 주어진 경로 중 아직 이미지 행이 참조하는 경로
+def get_image_paths_in_use(db: Session, paths: list[str]) -> set:
+    return set(db.execute(select(Image.path).where(Image.path.in_(paths)).distinct()).scalars())
+
+# Delete Image: 커밋은 호출한 쪽에서 한다
+def delete_images(db: Session, image_ids: list[int]):
+    return db.execute(delete(Image).where(Image.imageId.in_(image_ids))).rowcount
+
 # Create Disability
 def create_disability(db: Session, disability: DisabilityCreate, user_id: int):
     db_disability = Disability(
@@ -92,16 +123,28 @@ def create_log(db: Session, log: LogCreate, user_id: int, image_id: int, guide_i
     db.refresh(db_log)
     return db_log
 
-# Update Disability
+# Update Disability: 기존 목록과 비교해 빠진 항목만 삭제하고 새 항목만 한 번의 INSERT 로 추가
 def update_user_disabilities(db: Session, user_id: int, disabilities: list[str]):
-    # 기존 장애 목록 삭제
-    db.query(Disability).filter(Disability.userId == user_id).delete()
-    
-    # 새로운 장애 목록 추가
-    for obstacle in disabilities:
-        db_disability = Disability(userId=user_id, obstacle=obstacle)
-        db.add(db_disability)
-    
+    rows = db.execute(
+        select(Disability.disabilityId, Disability.obstacle).where(Disability.userId == user_id)
+    ).all()
+    obstacles = list(dict.fromkeys(disabilities))
+    kept = set()
+    removed_ids = []
+    for disability_id, obstacle in rows:
+        # 요청에 없는 항목과 중복 행은 삭제
+        if obstacle in obstacles and obstacle not in kept:
+            kept.add(obstacle)
+        else:
+            removed_ids.append(disability_id)
+    added = [obstacle for obstacle in obstacles if obstacle not in kept]
+
+    if removed_ids:
+        db.execute(delete(Disability).where(Disability.disabilityId.in_(removed_ids)))
+    if added:
+        db.execute(insert(Disability).values([
+            {"userId": user_id, "obstacle": obstacle} for obstacle in added
+        ]))
     db.commit()
     
 # Read Log
@@ -114,14 +157,34 @@ def get_logs(db: Session, skip: int = 0, limit: int = 10):
 def get_user_logs(db: Session, user_id: int):
     return db.query(Log).filter(Log.userId == user_id).all()
 
+# Read Log: [start, end) 기간에 만든 로그 (보관 파일에 쓰도록 가이드 정보도 함께)
+# after_log_id 이후의 로그를 logId 순으로 limit 개까지 (keyset 페이지)
+def get_logs_created_between(db: Session, start, end, after_log_id: int, limit: int):
+    return db.execute(
+        select(Log.logId, Log.userId, Log.imageId, Log.guideId, Log.createdAt, Reform.reformType, Reform.cloth)
+        .outerjoin(Reform, Log.guideId == Reform.guideId)
+        .where(Log.createdAt >= start, Log.createdAt < end, Log.logId > after_log_id)
+        .order_by(Log.logId)
+        .limit(limit)
+    ).all()
+
+def get_oldest_log_created_at(db: Session):
+    return db.execute(select(func.min(Log.createdAt))).scalar()
+
+# Delete Log: 커밋은 호출한 쪽에서 한다
+def delete_logs_created_between(db: Session, start, end):
+    return db.execute(delete(Log).where(Log.createdAt >= start, Log.createdAt < end)).rowcount
+
+# 주어진 이미지 중 아직 로그가 참조하는 이미지 id
+def get_log_image_ids(db: Session, image_ids: list[int]) -> set:
+    return set(db.execute(select(Log.imageId).where(Log.imageId.in_(image_ids)).distinct()).scalars())
+
 # Create Reform
 def create_reform(db: Session, reform: ReformCreate):
     db_reform = Reform(
         reformType=reform.reformType,
         cloth=reform.cloth,
-        fileName=reform.fileName,
-        contentType=reform.contentType,
-        path=reform.path
+        disabilityProfile=reform.disabilityProfile
     )
     db.add(db_reform)
     db.commit()
@@ -134,3 +197,40 @@ def get_reform(db: Session, guide_id: int):
 
 def get_reforms(db: Session, skip: int = 0, limit: int = 10):
     return db.query(Reform).offset(skip).limit(limit).all()
+
+# 주어진 사용자들의 로그에서 (userId, cloth, 횟수) 를 센다
+def count_user_clothes(db: Session, user_ids: list[int]):
+    return db.execute(
+        select(Log.userId, Reform.cloth, func.count())
+        .join(Reform, Log.guideId == Reform.guideId)
+        .where(Log.userId.in_(user_ids))
+        .group_by(Log.userId, Reform.cloth)
+    ).all()
+
+# Update Wardrobe Stat: 주어진 사용자들의 카운터를 다시 센 값으로 바꾼다 (커밋은 호출한 쪽에서 한다)
+def replace_wardrobe_stats(db: Session, user_ids: list[int], counts):
+    db.execute(delete(WardrobeStat).where(WardrobeStat.userId.in_(user_ids)))
+    if counts:
+        db.execute(insert(WardrobeStat).values([
+            {"userId": user_id, "cloth": cloth, "count": count} for user_id, cloth, count in counts
+        ]))
+
+# Read Cloth Cache
+def get_cloth_cache(db: Session, content_hash: str, model_version: str):
+    return db.get(ClothCache, (content_hash, model_version))
+
+# Create Cloth Cache
+def create_cloth_cache(db: Session, content_hash: str, model_version: str, cloth: str):
+    db_cache = ClothCache(
+        contentHash=content_hash,
+        modelVersion=model_version,
+        cloth=cloth
+    )
+    db.add(db_cache)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 동시에 같은 이미지가 올라온 경우 먼저 저장된 결과를 유지
+        db.rollback()
+        return get_cloth_cache(db, content_hash, model_version)
+    return db_cache
@@ -0,0 +1,196 @@
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models import User, Image, Disability, Log, Reform, ClothCache, WardrobeStat
+from schemas import UserCreate, ImageCreate, ReformCreate
+
+# crud.py 의 AsyncSession 버전. 비동기 세션에서는 관계를 지연 로딩할 수 없으므로 필요한 관계는 함께 조회한다
+
+# Create User: 사용자와 장애 목록을 한 트랜잭션으로 저장 (장애 목록은 한 번의 INSERT)
+async def create_user(db: AsyncSession, user: UserCreate):
+    db_user = User(
+        loginId=user.loginId,
+        password=user.password,
+        username=user.username
+    )
+    db.add(db_user)
+    await db.flush()
+
+    obstacles = list(dict.fromkeys(user.disabilities))
+    if obstacles:
+        await db.execute(insert(Disability).values([
+            {"userId": db_user.userId, "obstacle": obstacle} for obstacle in obstacles
+        ]))
+    await db.commit()
+
+    return db_user
+
+# Read User (disabilities 포함)
+async def get_user(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(User).options(selectinload(User.disabilities)).where(User.userId == user_id)
+    )
+    return result.scalars().first()
+
+async def get_user_by_loginId(db: AsyncSession, loginId: str):
+    result = await db.execute(select(User).where(User.loginId == loginId))
+    return result.scalars().first()
+
+# loginId 사용 여부만 확인 (User 행 전체를 읽지 않고 unique 인덱스만 조회)
+async def login_id_exists(db: AsyncSession, loginId: str) -> bool:
+    result = await db.execute(select(User.userId).where(User.loginId == loginId).limit(1))
+    return result.first() is not None
+
+# Update User
+async def update_user_name(db: AsyncSession, user_id: int, new_name: str):
+    user = await db.get(User, user_id)
+    if user:
+        user.username = new_name
+        await db.commit()
+        return user
+    return None
+
+# Update Disability: 기존 목록과 비교해 빠진 항목만 삭제하고 새 항목만 한 번의 INSERT 로 추가
+async def update_user_disabilities(db: AsyncSession, user_id: int, disabilities: list[str]):
+    result = await db.execute(
+        select(Disability.disabilityId, Disability.obstacle).where(Disability.userId == user_id)
+    )
+    obstacles = list(dict.fromkeys(disabilities))
+    kept = set()
+    removed_ids = []
+    for disability_id, obstacle in result:
+        # 요청에 없는 항목과 중복 행은 삭제
+        if obstacle in obstacles and obstacle not in kept:
+            kept.add(obstacle)
+        else:
+            removed_ids.append(disability_id)
+    added = [obstacle for obstacle in obstacles if obstacle not in kept]
+
+    if removed_ids:
+        await db.execute(delete(Disability).where(Disability.disabilityId.in_(removed_ids)))
+    if added:
+        await db.execute(insert(Disability).values([
+            {"userId": user_id, "obstacle": obstacle} for obstacle in added
+        ]))
+    await db.commit()
+
+# Read Log feed: 응답에 필요한 컬럼만 한 번의 조인으로 조회하고 logId 기준 keyset 으로 페이지를 나눈다
+# before_log_id 보다 작은 logId 를 최신순으로 limit 개 반환
+async def get_user_log_feed(db: AsyncSession, user_id: int, before_log_id: int = None, limit: int = 20):
+    query = (
+        select(Log.logId, Image.path, Reform.cloth)
+        .join(Image, Log.imageId == Image.imageId)
+        .join(Reform, Log.guideId == Reform.guideId)
+        .where(Log.userId == user_id)
+    )
+    if before_log_id is not None:
+        query = query.where(Log.logId < before_log_id)
+    result = await db.execute(query.order_by(Log.logId.desc()).limit(limit))
+    return result.all()
+
+# Read Reform Guide: 카탈로그 전체 (프로세스 메모리 캐시를 채울 때 사용)
+async def get_reform_guides(db: AsyncSession):
+    result = await db.execute(select(Reform))
+    return result.scalars().all()
+
+async def get_reform_guide_by_key(db: AsyncSession, reform_type: str, cloth: str, disability_profile: str = ""):
+    result = await db.execute(
+        select(Reform).where(
+            Reform.reformType == reform_type,
+            Reform.cloth == cloth,
+            Reform.disabilityProfile == disability_profile
+        )
+    )
+    return result.scalars().first()
+
+# Create Reform Guide: 카탈로그에 없는 키만 추가. 다른 요청이 먼저 추가했다면 그 행을 반환
+async def get_or_create_reform_guide(db: AsyncSession, reform: ReformCreate):
+    db_reform = await get_reform_guide_by_key(db, reform.reformType, reform.cloth, reform.disabilityProfile)
+    if db_reform is not None:
+        return db_reform
+    db_reform = Reform(
+        reformType=reform.reformType,
+        cloth=reform.cloth,
+        disabilityProfile=reform.disabilityProfile
+    )
+    db.add(db_reform)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return await get_reform_guide_by_key(db, reform.reformType, reform.cloth, reform.disabilityProfile)
+    return db_reform
+
+# Update Wardrobe Stat: (userId, cloth) 카운터를 1 늘린다. 없으면 1 로 만든다 (커밋은 호출한 쪽에서 한다)
+async def increment_wardrobe_stat(db: AsyncSession, user_id: int, cloth: str):
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql if dialect == "postgresql" else sqlite).insert(WardrobeStat).values(userId=user_id, cloth=cloth, count=1)
+        await db.execute(upsert.on_conflict_do_update(
+            index_elements=[WardrobeStat.userId, WardrobeStat.cloth],
+            set_={"count": WardrobeStat.count + 1}
+        ))
+        return
+    result = await db.execute(
+        update(WardrobeStat)
+        .where(WardrobeStat.userId == user_id, WardrobeStat.cloth == cloth)
+        .values(count=WardrobeStat.count + 1)
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(WardrobeStat).values(userId=user_id, cloth=cloth, count=1))
+
+# Read Wardrobe Stat: 사용자의 옷 종류별 카운터만 읽는다 (로그 수와 무관)
+async def get_wardrobe_stats(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(WardrobeStat.cloth, WardrobeStat.count).where(WardrobeStat.userId == user_id).order_by(WardrobeStat.cloth)
+    )
+    return result.all()
+
+# Create Image + Log: 카탈로그의 가이드를 가리키는 로그를 이미지, 옷 종류 카운터와 한 트랜잭션으로 저장 (커밋은 한 번)
+# 실패하면 호출한 쪽에서 rollback 한다
+async def create_image_log(db: AsyncSession, image: ImageCreate, user_id: int, guide_id: int, cloth: str):
+    db_image = Image(
+        userId=user_id,
+        fileName=image.fileName,
+        path=image.path,
+        contentType=image.contentType
+    )
+    db.add(db_image)
+    await db.flush()
+
+    db_log = Log(
+        userId=user_id,
+        imageId=db_image.imageId,
+        guideId=guide_id
+    )
+    db.add(db_log)
+    await increment_wardrobe_stat(db, user_id, cloth)
+    await db.commit()
+    return db_image, db_log
+
+# Read Image: 해당 경로를 참조하는 이미지가 있는지 확인
+async def image_path_in_use(db: AsyncSession, path: str) -> bool:
+    result = await db.execute(select(Image.imageId).where(Image.path == path).limit(1))
+    return result.first() is not None
+
+# Read Cloth Cache
+async def get_cloth_cache(db: AsyncSession, content_hash: str, model_version: str):
+    return await db.get(ClothCache, (content_hash, model_version))
+
+# Create Cloth Cache
+async def create_cloth_cache(db: AsyncSession, content_hash: str, model_version: str, cloth: str):
+    db_cache = ClothCache(
+        contentHash=content_hash,
+        modelVersion=model_version,
+        cloth=cloth
+    )
+    db.add(db_cache)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 동시에 같은 이미지가 올라온 경우 먼저 저장된 결과를 유지
+        await db.rollback()
+        return await get_cloth_cache(db, content_hash, model_version)
+    return db_cache
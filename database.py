@@ -1,6 +1,9 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from core.dbpool import PoolMetrics, create_instrumented_engine, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW
 import os
 from dotenv import load_dotenv
 
@@ -10,16 +13,57 @@ db_user = os.getenv("DB_USER")
 db_password = os.getenv("DB_PASSWORD")
 db_host = os.getenv("DB_HOST")
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{db_user}:{db_password}@{db_host}:5432/{db_name}"
+# DB_URL 을 지정하면 그대로 사용 (벤치마크나 로컬 실행용 sqlite 등)
+SQLALCHEMY_DATABASE_URL = os.getenv("DB_URL") or f"postgresql://{db_user}:{db_password}@{db_host}:5432/{db_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# API 는 비동기 드라이버(asyncpg, aiosqlite) 를 사용한다
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# 동기 엔진과 세션은 스크립트와 백그라운드 스레드 작업용
+# 풀 크기와 타임아웃은 core/dbpool.py 의 DB_POOL_* 환경 변수로 설정하고, 지표는 /metrics 로 노출
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+engine = create_instrumented_engine(
+    create_engine, SQLALCHEMY_DATABASE_URL, sync_pool_metrics, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW, connect_args=connect_args
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_instrumented_engine(
+    create_async_engine, ASYNC_DATABASE_URL, async_pool_metrics, DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+# 커밋 후에도 응답을 만들 때 속성을 다시 읽지 않도록 expire_on_commit=False
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# 읽기 전용 복제본. DB_REPLICA_URL 을 지정하면 조회 API 가 사용한다 (라우팅은 core/replica.py)
+# 로컬에서는 sqlite 파일 두 개나 Postgres 두 개로 확인할 수 있다
+DB_REPLICA_URL = os.getenv("DB_REPLICA_URL")
+# 복제본 연결을 기다리는 시간(초). 넘으면 primary 로 조회한다
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+
+replica_pool_metrics = PoolMetrics("replica")
+replica_engine = None
+ReplicaSessionLocal = None
+if DB_REPLICA_URL:
+    replica_url = to_async_url(DB_REPLICA_URL)
+    replica_connect_args = {"timeout": DB_REPLICA_CONNECT_TIMEOUT} if make_url(replica_url).get_backend_name() in ASYNC_DRIVERS else {}
+    replica_engine = create_instrumented_engine(
+        create_async_engine, replica_url, replica_pool_metrics, DB_POOL_SIZE, DB_MAX_OVERFLOW, connect_args=replica_connect_args
+    )
+    ReplicaSessionLocal = async_sessionmaker(replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
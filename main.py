@@ -1,9 +1,53 @@
-from fastapi import FastAPI
-from database import engine, Base
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from database import engine, async_engine, replica_engine, AsyncSessionLocal
 from routers import router as api_router
+from core.inference import inference_pool, INFERENCE_LAZY
+from core.jobs import job_queue
+from core.auth import AuthError
+from core.loginid_index import login_id_index
+from core.schema import check_schema
+from core.guide_catalog import guide_catalog
+from core.partitions import prepare_log_partitions
+from core.upload import UploadSizeLimitMiddleware, UPLOAD_MAX_BYTES, UPLOAD_MAX_REQUEST_BYTES, UPLOAD_FORM_OVERHEAD
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 테이블은 alembic 마이그레이션으로 만든다. 스키마가 뒤처져 있으면 시작하지 않는다
+    check_schema(engine)
+    # Postgres 에서는 앞으로 쓸 log 월별 파티션을 미리 만든다
+    prepare_log_partitions(engine)
+    # 리폼 가이드 카탈로그를 메모리에 읽어 둔다
+    async with AsyncSessionLocal() as db:
+        await guide_catalog.load(db)
+    # 추론 워커는 백그라운드에서 준비하고 API 는 바로 요청을 받는다
+    if not INFERENCE_LAZY:
+        inference_pool.start_background()
+    # loginId 인덱스는 백그라운드에서 채우고, 채우기 전에는 DB 로 확인한다
+    login_id_index.start()
+    yield
+    login_id_index.shutdown()
+    job_queue.shutdown()
+    inference_pool.shutdown()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# 업로드 API 는 Content-Length 로 크기를 먼저 확인한다
+app.add_middleware(UploadSizeLimitMiddleware, limits={
+    "/reform-guide": UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD,
+    "/reform-guide/batch": UPLOAD_MAX_REQUEST_BYTES
+})
+
+# 인증 의존성에서 발생한 오류를 다른 API 와 같은 형식으로 응답
+@app.exception_handler(AuthError)
+async def auth_error_handler(request: Request, exc: AuthError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"errorMessage": exc.message}
+    )
 
 app.include_router(api_router)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""initial schema
+
+create_all 로 만들던 테이블과 같은 스키마 (clothCache 는 0006).
+버전 정보 없이 create_all 로 만든 DB 는 `python -m scripts.migrate` 가
+0001 로 표시한 뒤 upgrade 한다.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 21:57:01.066531
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user',
+        sa.Column('userId', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('loginId', sa.String(length=20), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('userId'),
+        sa.UniqueConstraint('loginId'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_index('ix_user_userId', 'user', ['userId'])
+
+    op.create_table(
+        'reformGuide',
+        sa.Column('guideId', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('reformType', sa.String(length=500), nullable=False),
+        sa.Column('cloth', sa.String(length=500), nullable=False),
+        sa.Column('fileName', sa.String(length=255), nullable=False),
+        sa.Column('contentType', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('guideId')
+    )
+    op.create_index('ix_reformGuide_guideId', 'reformGuide', ['guideId'])
+
+    op.create_table(
+        'image',
+        sa.Column('imageId', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('userId', sa.Integer(), nullable=True),
+        sa.Column('fileName', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('contentType', sa.String(length=128), nullable=False),
+        sa.ForeignKeyConstraint(['userId'], ['user.userId']),
+        sa.PrimaryKeyConstraint('imageId')
+    )
+    op.create_index('ix_image_imageId', 'image', ['imageId'])
+
+    op.create_table(
+        'disability',
+        sa.Column('disabilityId', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('userId', sa.Integer(), nullable=True),
+        sa.Column('obstacle', sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(['userId'], ['user.userId']),
+        sa.PrimaryKeyConstraint('disabilityId')
+    )
+    op.create_index('ix_disability_disabilityId', 'disability', ['disabilityId'])
+
+    op.create_table(
+        'log',
+        sa.Column('logId', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('userId', sa.Integer(), nullable=True),
+        sa.Column('imageId', sa.Integer(), nullable=True),
+        sa.Column('guideId', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['guideId'], ['reformGuide.guideId']),
+        sa.ForeignKeyConstraint(['imageId'], ['image.imageId']),
+        sa.ForeignKeyConstraint(['userId'], ['user.userId']),
+        sa.PrimaryKeyConstraint('logId')
+    )
+    op.create_index('ix_log_logId', 'log', ['logId'])
+
+
+def downgrade():
+    op.drop_index('ix_log_logId', table_name='log')
+    op.drop_table('log')
+    op.drop_index('ix_disability_disabilityId', table_name='disability')
+    op.drop_table('disability')
+    op.drop_index('ix_image_imageId', table_name='image')
+    op.drop_table('image')
+    op.drop_index('ix_reformGuide_guideId', table_name='reformGuide')
+    op.drop_table('reformGuide')
+    op.drop_index('ix_user_userId', table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,31 @@
+"""index user foreign keys
+
+/user 의 장애 목록과 이미지 조회가 userId 로 테이블 전체를 읽지 않도록 인덱스를 추가한다.
+log 는 /user/log 의 (userId 조건, logId 역순 keyset) 조회에 맞춘 복합 인덱스가
+userId 외래 키 인덱스 역할도 한다.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 22:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_disability_userId', 'disability', ['userId'])
+    op.create_index('ix_image_userId', 'image', ['userId'])
+    op.create_index('ix_log_userId_logId', 'log', ['userId', 'logId'])
+
+
+def downgrade():
+    op.drop_index('ix_log_userId_logId', table_name='log')
+    op.drop_index('ix_image_userId', table_name='image')
+    op.drop_index('ix_disability_userId', table_name='disability')
@@ -0,0 +1,69 @@
+"""reform guide catalog
+
+reformGuide 를 업로드마다 한 행씩 쌓던 구조에서 (reformType, cloth, disabilityProfile)
+마다 한 행인 카탈로그로 바꾼다. 같은 (reformType, cloth) 의 중복 행은 가장 작은 guideId
+하나만 남기고 log.guideId 를 그 행으로 옮긴 뒤 지운다. 이미지와 중복되던
+fileName, contentType, path 컬럼은 삭제한다 (이미지 정보는 image 테이블에 있다).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 23:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+reform_guide = sa.table(
+    'reformGuide',
+    sa.column('guideId', sa.Integer()),
+    sa.column('reformType', sa.String()),
+    sa.column('cloth', sa.String())
+)
+log = sa.table('log', sa.column('guideId', sa.Integer()))
+
+
+def upgrade():
+    # 로그가 가리키는 가이드를 같은 (reformType, cloth) 의 가장 작은 guideId 로 바꾼다
+    current = reform_guide.alias('current')
+    same = reform_guide.alias('same')
+    canonical_id = (
+        sa.select(sa.func.min(same.c.guideId))
+        .select_from(current.join(
+            same,
+            sa.and_(current.c.reformType == same.c.reformType, current.c.cloth == same.c.cloth)
+        ))
+        .where(current.c.guideId == log.c.guideId)
+        .scalar_subquery()
+    )
+    op.execute(log.update().where(log.c.guideId.isnot(None)).values(guideId=canonical_id))
+
+    # 남길 행을 제외한 중복 행 삭제
+    kept_ids = sa.select(sa.func.min(reform_guide.c.guideId)).group_by(
+        reform_guide.c.reformType, reform_guide.c.cloth
+    )
+    op.execute(reform_guide.delete().where(reform_guide.c.guideId.not_in(kept_ids)))
+
+    with op.batch_alter_table('reformGuide') as batch_op:
+        batch_op.add_column(sa.Column('disabilityProfile', sa.String(length=500), server_default='', nullable=False))
+        batch_op.drop_column('path')
+        batch_op.drop_column('contentType')
+        batch_op.drop_column('fileName')
+        batch_op.create_unique_constraint('uq_reformGuide_key', ['reformType', 'cloth', 'disabilityProfile'])
+
+
+def downgrade():
+    # 삭제한 중복 행과 파일 정보는 되살리지 않는다
+    with op.batch_alter_table('reformGuide') as batch_op:
+        batch_op.drop_constraint('uq_reformGuide_key', type_='unique')
+        batch_op.add_column(sa.Column('fileName', sa.String(length=255), server_default='', nullable=False))
+        batch_op.add_column(sa.Column('contentType', sa.String(length=255), server_default='', nullable=False))
+        batch_op.add_column(sa.Column('path', sa.String(length=255), server_default='', nullable=False))
+        batch_op.drop_column('disabilityProfile')
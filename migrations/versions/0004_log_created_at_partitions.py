@@ -0,0 +1,121 @@
+"""log and image createdAt, monthly log partitions
+
+log 와 image 에 createdAt 을 추가한다. 기존 행은 마이그레이션 시각으로 채워진다.
+Postgres 에서는 log 를 createdAt 기준 월별 RANGE 파티션 테이블로 다시 만들고
+(기본 키는 파티션 키를 포함해야 하므로 (logId, createdAt)), 이번 달부터
+3개월 뒤까지의 파티션과 기본 파티션을 만든다. 이후 파티션은 앱 시작 시와
+scripts/retention.py 실행 시 만든다 (core/partitions.py). 다른 DB 는 createdAt 인덱스만 추가한다.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 23:40:00.000000
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+PARTITIONS_AHEAD = 3
+
+LOG_COLUMNS = '"logId", "userId", "imageId", "guideId"'
+
+
+def month_bounds(offset):
+    now = datetime.now(timezone.utc)
+    index = now.year * 12 + now.month - 1 + offset
+    start = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    index += 1
+    end = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def add_created_at(table_name):
+    # sqlite 는 ALTER TABLE 로 CURRENT_TIMESTAMP 기본값 컬럼을 추가할 수 없어 테이블을 다시 만든다
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    with op.batch_alter_table(table_name, recreate=recreate) as batch_op:
+        batch_op.add_column(sa.Column('createdAt', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+    op.create_index(f'ix_{table_name}_createdAt', table_name, ['createdAt'])
+
+
+def upgrade():
+    add_created_at('image')
+
+    if op.get_bind().dialect.name != 'postgresql':
+        add_created_at('log')
+        return
+
+    # 기존 테이블을 옆으로 옮기고 같은 이름의 파티션 테이블로 행을 복사한다 (logId 시퀀스는 그대로 이어서 사용)
+    op.execute('ALTER SEQUENCE "log_logId_seq" OWNED BY NONE')
+    op.execute('ALTER TABLE log RENAME TO log_unpartitioned')
+    op.execute('ALTER TABLE log_unpartitioned RENAME CONSTRAINT log_pkey TO log_unpartitioned_pkey')
+    op.drop_index('ix_log_userId_logId', table_name='log_unpartitioned')
+    op.drop_index('ix_log_logId', table_name='log_unpartitioned')
+
+    op.execute(
+        'CREATE TABLE log ('
+        '"logId" integer NOT NULL DEFAULT nextval(\'"log_logId_seq"\'), '
+        '"userId" integer REFERENCES "user" ("userId"), '
+        '"imageId" integer REFERENCES image ("imageId"), '
+        '"guideId" integer REFERENCES "reformGuide" ("guideId"), '
+        '"createdAt" timestamp with time zone NOT NULL DEFAULT now(), '
+        'CONSTRAINT log_pkey PRIMARY KEY ("logId", "createdAt")'
+        ') PARTITION BY RANGE ("createdAt")'
+    )
+    op.execute('CREATE TABLE log_default PARTITION OF log DEFAULT')
+    for offset in range(PARTITIONS_AHEAD + 1):
+        start, end = month_bounds(offset)
+        op.execute(
+            f'CREATE TABLE "log_y{start.year:04d}m{start.month:02d}" PARTITION OF log '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute('ALTER SEQUENCE "log_logId_seq" OWNED BY log."logId"')
+
+    op.execute(f'INSERT INTO log ({LOG_COLUMNS}, "createdAt") SELECT {LOG_COLUMNS}, now() FROM log_unpartitioned')
+    op.drop_table('log_unpartitioned')
+
+    op.create_index('ix_log_logId', 'log', ['logId'])
+    op.create_index('ix_log_userId_logId', 'log', ['userId', 'logId'])
+    op.create_index('ix_log_createdAt', 'log', ['createdAt'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_log_createdAt', table_name='log')
+        with op.batch_alter_table('log') as batch_op:
+            batch_op.drop_column('createdAt')
+    else:
+        op.execute('ALTER SEQUENCE "log_logId_seq" OWNED BY NONE')
+        op.execute('ALTER TABLE log RENAME TO log_partitioned')
+        op.execute('ALTER TABLE log_partitioned RENAME CONSTRAINT log_pkey TO log_partitioned_pkey')
+        op.drop_index('ix_log_createdAt', table_name='log_partitioned')
+        op.drop_index('ix_log_userId_logId', table_name='log_partitioned')
+        op.drop_index('ix_log_logId', table_name='log_partitioned')
+
+        op.create_table(
+            'log',
+            sa.Column('logId', sa.Integer(), server_default=sa.text('nextval(\'"log_logId_seq"\')'), nullable=False),
+            sa.Column('userId', sa.Integer(), nullable=True),
+            sa.Column('imageId', sa.Integer(), nullable=True),
+            sa.Column('guideId', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['guideId'], ['reformGuide.guideId']),
+            sa.ForeignKeyConstraint(['imageId'], ['image.imageId']),
+            sa.ForeignKeyConstraint(['userId'], ['user.userId']),
+            sa.PrimaryKeyConstraint('logId', name='log_pkey')
+        )
+        op.execute('ALTER SEQUENCE "log_logId_seq" OWNED BY log."logId"')
+        op.execute(f'INSERT INTO log ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM log_partitioned')
+        op.execute('DROP TABLE log_partitioned CASCADE')
+        op.create_index('ix_log_logId', 'log', ['logId'])
+        op.create_index('ix_log_userId_logId', 'log', ['userId', 'logId'])
+
+    op.drop_index('ix_image_createdAt', table_name='image')
+    with op.batch_alter_table('image') as batch_op:
+        batch_op.drop_column('createdAt')
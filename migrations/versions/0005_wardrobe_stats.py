@@ -0,0 +1,34 @@
+"""wardrobe stats
+
+사용자별 옷 종류 검출 횟수 카운터 테이블. 리폼 가이드를 저장할 때 함께 늘린다.
+기존 로그의 횟수는 upgrade 후 `python -m scripts.backfill_wardrobe_stats` 로 채운다.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'wardrobeStat',
+        sa.Column('userId', sa.Integer(), nullable=False),
+        sa.Column('cloth', sa.String(length=500), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['userId'], ['user.userId']),
+        sa.PrimaryKeyConstraint('userId', 'cloth')
+    )
+
+
+def downgrade():
+    op.drop_table('wardrobeStat')
@@ -0,0 +1,36 @@
+"""cloth cache
+
+업로드 해시와 모델 버전별 검출 결과 캐시 테이블.
+0001 이 이 테이블까지 만들던 때 upgrade 한 DB 나 create_all 로 만든 DB 에는
+이미 있으므로 없을 때만 만든다.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 01:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'clothCache' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'clothCache',
+        sa.Column('contentHash', sa.String(length=64), nullable=False),
+        sa.Column('modelVersion', sa.String(length=64), nullable=False),
+        sa.Column('cloth', sa.String(length=500), nullable=False),
+        sa.PrimaryKeyConstraint('contentHash', 'modelVersion')
+    )
+
+
+def downgrade():
+    op.drop_table('clothCache')
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -17,23 +17,28 @@ class User(Base):
     
 class Reform(Base):
     __tablename__ = 'reformGuide'
+    # 리폼 가이드 카탈로그: (reformType, cloth, disabilityProfile) 마다 한 행. 업로드마다 행을 만들지 않는다
+    __table_args__ = (UniqueConstraint('reformType', 'cloth', 'disabilityProfile', name='uq_reformGuide_key'),)
     
     guideId = Column(Integer, primary_key=True, index=True, autoincrement=True)
     reformType = Column(String(500), nullable=False)
     cloth = Column(String(500), nullable=False)
-    fileName = Column(String(255), nullable=False)
-    contentType = Column(String(255), nullable=False)
-    path = Column(String(255), nullable=False)
+    # 장애 종류를 정렬해 쉼표로 이은 값. 빈 문자열은 모든 사용자에게 쓰는 가이드
+    disabilityProfile = Column(String(500), nullable=False, server_default='')
     
     reformLog = relationship("Log", back_populates="logReform")
     
 class Log(Base):
     __tablename__ = 'log'
+    # /user/log 의 userId 조건 + logId 역순 keyset 조회용 (userId 외래 키 인덱스도 겸한다)
+    __table_args__ = (Index('ix_log_userId_logId', 'userId', 'logId'),)
+    # Postgres 에서는 createdAt 기준 월별 파티션 테이블이고 기본 키는 (logId, createdAt) 이다 (core/partitions.py)
     
     logId = Column(Integer, primary_key=True, index=True, autoincrement=True)
     userId = Column(Integer, ForeignKey('user.userId'))
     imageId = Column(Integer, ForeignKey('image.imageId'))
     guideId = Column(Integer, ForeignKey('reformGuide.guideId'))
+    createdAt = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
     
     logUser = relationship("User", back_populates="logs")
     logImage = relationship("Image", back_populates="imageLog")
@@ -43,10 +48,11 @@ class Image(Base):
     __tablename__ = 'image'
     
     imageId = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    userId = Column(Integer, ForeignKey('user.userId'))
+    userId = Column(Integer, ForeignKey('user.userId'), index=True)
     fileName = Column(String(255), nullable=False)
     path = Column(String(255), nullable=False)
     contentType = Column(String(128), nullable=False)
+    createdAt = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
     imageUser = relationship("User", back_populates="images")
     imageLog = relationship("Log", back_populates="logImage")
     
@@ -54,7 +60,22 @@ class Disability(Base):
     __tablename__ = 'disability'
     
     disabilityId = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    userId = Column(Integer, ForeignKey('user.userId'))
+    userId = Column(Integer, ForeignKey('user.userId'), index=True)
     obstacle = Column(String(255), nullable=False)
     
-    disabilityUser = relationship("User", back_populates="disabilities")
\ No newline at end of file
+    disabilityUser = relationship("User", back_populates="disabilities")
+
+class ClothCache(Base):
+    __tablename__ = 'clothCache'
+
+    contentHash = Column(String(64), primary_key=True)
+    modelVersion = Column(String(64), primary_key=True)
+    cloth = Column(String(500), nullable=False)
+
+# 사용자별 옷 종류 검출 횟수. 리폼 가이드를 저장하는 트랜잭션에서 함께 늘린다
+class WardrobeStat(Base):
+    __tablename__ = 'wardrobeStat'
+
+    userId = Column(Integer, ForeignKey('user.userId'), primary_key=True)
+    cloth = Column(String(500), primary_key=True)
+    count = Column(Integer, nullable=False, server_default='0')
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from . import auth, user, image
+from . import auth, user, image, health
 
 router = APIRouter()
 router.include_router(auth.router, tags=["auth"])
 router.include_router(user.router, tags=["users"])
-router.include_router(image.router, tags=["images"])
\ No newline at end of file
+router.include_router(image.router, tags=["images"])
+router.include_router(health.router, tags=["health"])
\ No newline at end of file
@@ -1,14 +1,19 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from schemas import UserCreateRequest, UserCreateResponse, UserCreate, LoginRequest
-from core.security import get_password_hash, verify_password, create_access_token, decode_access_token
-from crud import create_user, get_user_by_loginId
+from core.security import get_password_hash_async, verify_and_update_password, create_access_token, decode_access_token
+from core.admission import admission, AdmissionRejected
+from core.loginid_index import login_id_index
+from core.revocation import is_token_revoked, revoke_token, token_id
+from crud_async import create_user, get_user_by_loginId, login_id_exists
 from database import get_db
+from core.replica import read_router, get_read_db
 
 router = APIRouter()
 
@@ -16,9 +21,26 @@ router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 요청 수 제한이나 해시 계산 대기열에 걸린 요청은 Retry-After 와 함께 거절
+def admission_rejected(e: AdmissionRejected):
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"errorMessage": e.message},
+        headers=e.headers
+    )
+
+# 인덱스에 없으면 DB 를 조회하지 않고 사용 가능으로 판단, 있을 수도 있으면 DB 로 확인
+async def is_login_id_taken(db: AsyncSession, login_id: str) -> bool:
+    if not login_id_index.might_exist(login_id):
+        return False
+    exists = await login_id_exists(db, login_id)
+    if login_id_index.ready:
+        login_id_index.record_check(exists)
+    return exists
+
 # 회원가입 기능
 @router.post("/signup", response_model=UserCreateResponse, status_code=status.HTTP_201_CREATED)
-async def signup(request: Request, db: Session = Depends(get_db)):
+async def signup(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         user = await request.json()
         user = UserCreateRequest(**user)
@@ -29,24 +51,45 @@ async def signup(request: Request, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"errorMessage": f"{errors} is a required field."}
         )
-    db_user = get_user_by_loginId(db, user.loginId)
-    if db_user:
+    try:
+        admission.check(request, user.loginId)
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+
+    if await is_login_id_taken(db, user.loginId):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="loginId is already in use.")
     
     try:
+        async with admission.hashing.slot():
+            password_hash = await get_password_hash_async(user.password)
         user_data = UserCreate(
             loginId=user.loginId,
-            password=get_password_hash(user.password),
+            password=password_hash,
             username=user.name,
             disabilities=user.disabilities
         )
-        db_user = create_user(db, user_data)
+        try:
+            db_user = await create_user(db, user_data)
+        except IntegrityError:
+            # 확인 이후 같은 loginId 로 먼저 가입한 경우
+            await db.rollback()
+            if await login_id_exists(db, user.loginId):
+                login_id_index.add(user.loginId)
+                return JSONResponse(
+                    status_code=status.HTTP_409_CONFLICT,
+                    content={"detail": "loginId is already in use."}
+                )
+            raise
+        login_id_index.add(db_user.loginId)
+        read_router.mark_write(db_user.userId)
         
         return UserCreateResponse(
             name=db_user.username,
             message="Registration successful",
             userId=db_user.userId
         )
+    except AdmissionRejected as e:
+        return admission_rejected(e)
     except Exception as e:
         logger.error(f"Error occurred while creating user: {e}")
         return JSONResponse(
@@ -56,7 +99,7 @@ async def signup(request: Request, db: Session = Depends(get_db)):
 
 # 로그인
 @router.post("/signin", status_code=status.HTTP_200_OK)
-async def signin(request: Request, db: Session = Depends(get_db)):
+async def signin(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         credentials = await request.json()
         credentials = LoginRequest(**credentials)
@@ -67,22 +110,42 @@ async def signin(request: Request, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"errorMessage": f"{errors} is a required field."}
         )
+
+    try:
+        admission.check(request, credentials.loginId)
+    except AdmissionRejected as e:
+        return admission_rejected(e)
     
     try:
-        user = get_user_by_loginId(db, credentials.loginId)
-        if not user or not verify_password(credentials.password, user.password):
+        user = await get_user_by_loginId(db, credentials.loginId)
+        if not user:
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"errorMessage": "Login Failed."}
+            )
+        async with admission.hashing.slot():
+            verified, new_hash = await verify_and_update_password(credentials.password, user.password)
+        if not verified:
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"errorMessage": "Login Failed."}
             )
+        if new_hash:
+            # bcrypt cost 가 바뀐 경우 새 cost 로 다시 저장 (실패해도 로그인은 진행)
+            try:
+                user.password = new_hash
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Error occurred while rehashing password: {e}")
+                await db.rollback()
         
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": user.loginId}, expires_delta=access_token_expires
+            data={"sub": user.loginId, "uid": user.userId}, expires_delta=access_token_expires
         )
         refresh_token_expires = timedelta(days=7)
         refresh_token = create_access_token(
-            data={"sub": user.loginId}, expires_delta=refresh_token_expires
+            data={"sub": user.loginId, "uid": user.userId}, expires_delta=refresh_token_expires
         )
         
         headers = {
@@ -94,6 +157,9 @@ async def signin(request: Request, db: Session = Depends(get_db)):
             content={"message": "Login Success."},
             headers=headers
         )
+
+    except AdmissionRejected as e:
+        return admission_rejected(e)
     
     except Exception as e:
         logger.error(f"Error occurred during login: {e}")
@@ -104,7 +170,7 @@ async def signin(request: Request, db: Session = Depends(get_db)):
         
 # 아이디 중복 확인
 @router.get("/check-loginid", status_code=status.HTTP_200_OK)
-async def check_loginid(loginid: str = Query(default=None), db: Session = Depends(get_db)):
+async def check_loginid(loginid: str = Query(default=None), db: AsyncSession = Depends(get_read_db)):
     if not loginid:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -112,8 +178,7 @@ async def check_loginid(loginid: str = Query(default=None), db: Session = Depend
         )
 
     try:
-        db_user = get_user_by_loginId(db, loginid)
-        if db_user:
+        if await is_login_id_taken(db, loginid):
             return JSONResponse(
                 status_code=status.HTTP_409_CONFLICT,
                 content={"errorMessage": "Loginid is already in use."}
@@ -132,7 +197,7 @@ async def check_loginid(loginid: str = Query(default=None), db: Session = Depend
         
 # access token 재발행
 @router.post("/refresh", status_code=status.HTTP_200_OK)
-async def refresh_token(refresh: str = Header(None), db: Session = Depends(get_db)):
+async def refresh_token(refresh: str = Header(None), db: AsyncSession = Depends(get_db)):
     if not refresh:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -141,13 +206,13 @@ async def refresh_token(refresh: str = Header(None), db: Session = Depends(get_d
     
     try:
         payload = decode_access_token(refresh)
-        if payload is None:
+        if payload is None or await is_token_revoked(token_id(payload, refresh)):
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"errorMessage": "Invalid refresh token"}
             )
         
-        user = get_user_by_loginId(db, payload["sub"])
+        user = await get_user_by_loginId(db, payload["sub"])
         if user is None:
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -156,11 +221,11 @@ async def refresh_token(refresh: str = Header(None), db: Session = Depends(get_d
 
         access_token_expires = timedelta(minutes=30)
         new_access_token = create_access_token(
-            data={"sub": user.loginId}, expires_delta=access_token_expires
+            data={"sub": user.loginId, "uid": user.userId}, expires_delta=access_token_expires
         )
         refresh_token_expires = timedelta(days=7)
         new_refresh_token = create_access_token(
-            data={"sub": user.loginId}, expires_delta=refresh_token_expires
+            data={"sub": user.loginId, "uid": user.userId}, expires_delta=refresh_token_expires
         )
         
         headers = {
@@ -182,7 +247,7 @@ async def refresh_token(refresh: str = Header(None), db: Session = Depends(get_d
 
 # 로그아웃
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout(access: str = Header(None)):
+async def logout(access: str = Header(None), refresh: str = Header(None)):
     if not access:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,6 +261,14 @@ async def logout(access: str = Header(None)):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"errorMessage": "Access token has expired"}
             )
+
+        # 만료 시각까지 폐기 목록에 넣는다. refresh 토큰을 함께 보내면 같이 폐기
+        await revoke_token(token_id(payload, access), payload["exp"])
+        if refresh:
+            refresh_payload = decode_access_token(refresh)
+            if refresh_payload is not None:
+                await revoke_token(token_id(refresh_payload, refresh), refresh_payload["exp"])
+
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"message": "Logout successful."}
@@ -0,0 +1,44 @@
+import os
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from core.inference import inference_pool
+from core.dbpool import render_pool_metrics
+from core.replica import read_router
+from core.loginid_index import login_id_index
+from core.admission import admission
+from database import sync_pool_metrics, async_pool_metrics, replica_pool_metrics
+
+router = APIRouter()
+
+# 프로세스 생존 확인 (모델 준비 여부와 무관). pid 로 응답한 워커 프로세스를 구분한다
+@router.get("/health", status_code=status.HTTP_200_OK)
+async def health():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"status": "ok", "pid": os.getpid()}
+    )
+
+# 추론 워커가 모두 모델을 로드하고 워밍업을 마쳤는지 확인
+@router.get("/health/ready", status_code=status.HTTP_200_OK)
+async def readiness():
+    inference = inference_pool.status()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if inference_pool.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "inference": inference,
+            "readReplica": read_router.stats(),
+            "loginIdIndex": login_id_index.stats(),
+            "admission": admission.stats()
+        }
+    )
+
+# 커넥션 풀 지표 (Prometheus 텍스트 형식, 워커 프로세스별 값)
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def metrics():
+    metrics_list = [async_pool_metrics, sync_pool_metrics]
+    if read_router.enabled:
+        metrics_list.append(replica_pool_metrics)
+    return PlainTextResponse(
+        render_pool_metrics(metrics_list),
+        media_type="text/plain; version=0.0.4"
+    )
@@ -1,156 +1,365 @@
+import asyncio
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header
-from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
-from datetime import timedelta
-from schemas import ReformCreate, ImageCreate, LogCreate
-from crud import create_image, create_reform, create_log, get_user_by_loginId
-from database import get_db
-from core.security import decode_access_token
-import torch
-from ultralytics import YOLO
-from PIL import Image
-import io
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import JSONResponse, StreamingResponse
+from schemas import ImageCreate
+from crud_async import create_image_log, image_path_in_use
+from database import get_db, AsyncSessionLocal
+from core.auth import Principal, get_current_principal
+from core.inference import scheduler, InferenceNotReady
+from core.cache import result_cache
+from core.guide_catalog import guide_catalog, DEFAULT_REFORM_TYPE
+from core.replica import read_router
+from core.preprocess import decode_image_async, ImageDecodeError
+from core.upload import IngestedUpload, UploadRejected, ingest_upload
+from core.jobs import job_queue, JobFailed, JobQueueFull, QUEUED
+from core.timing import StageTimer
+from starlette.background import BackgroundTask
+import os
 
 router = APIRouter()
 
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-# 모델 로드
-model = YOLO("./routers/best.pt").to(device)
-
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 배치 요청 하나가 동시에 검출하는 이미지 수 (커넥션과 추론 대기열을 한 요청이 독차지하지 않도록)
+REFORM_GUIDE_BATCH_CONCURRENCY = int(os.getenv("REFORM_GUIDE_BATCH_CONCURRENCY", "4"))
+
+# 리폼 가이드 생성 단계에서 발생한 오류 (응답에 그대로 쓰이는 메시지를 담는다)
+class ReformGuideError(Exception):
+    def __init__(self, message: str, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+# 캐시 조회/저장 실패는 추론을 막지 않도록 캐시 미스로 처리
+# 조회가 끝나면 읽기 트랜잭션을 끝내 디코딩/추론 동안 커넥션을 붙잡지 않는다
+async def lookup_cached_cloth(db: AsyncSession, content_hash: str):
+    try:
+        cloth = await result_cache.lookup(db, content_hash)
+        await db.commit()
+        return cloth
+    except Exception as e:
+        logger.warning(f"Error occurred while reading the result cache: {e}")
+        await db.rollback()
+        return None
+
+async def store_cached_cloth(db: AsyncSession, content_hash: str, cloth: str):
+    try:
+        await result_cache.store(db, content_hash, cloth)
+    except Exception as e:
+        logger.warning(f"Error occurred while writing the result cache: {e}")
+        await db.rollback()
+
+# 옷 종류를 검출한 뒤 이미지를 저장. (저장 경로, 옷 종류) 를 반환
+# 디코딩은 임시 파일(.part) 에서 하고, 검출에 실패하면 images/ 에 파일을 남기지 않는다
+async def detect_cloth(db: AsyncSession, upload: IngestedUpload, timer: StageTimer):
+    content_hash = upload.content_hash
+
+    # 이전에 분석한 이미지라면 캐시된 결과를 사용
+    with timer.stage("cache"):
+        cloth_type = await lookup_cached_cloth(db, content_hash)
+
+    try:
+        # yolo 모델 사용 코드 --------------------------------
+        if cloth_type is None:
+            with timer.stage("decode"):
+                view = upload.open_view()
+                try:
+                    image_array = await decode_image_async(view)
+                finally:
+                    view.close()
+            with timer.stage("inference"):
+                detections = await scheduler.submit(image_array)
+            for class_name, score in detections:
+                print(f"Detected {class_name} with confidence {score:.2f}. filename: {upload.filename}")
+                logger.debug(f"Detected {class_name} with confidence {score:.2f}")
+                cloth_type = class_name
+            if cloth_type is None:
+                raise ReformGuideError("No cloth detected in the image.", status.HTTP_422_UNPROCESSABLE_ENTITY)
+            await store_cached_cloth(db, content_hash, cloth_type)
+        # ----------------------------------------------------
+    except ReformGuideError as e:
+        logger.info(f"{e.message} filename: {upload.filename}")
+        raise
+    except ImageDecodeError as e:
+        # 허용한 형식으로 올렸지만 이미지로 읽을 수 없는 경우는 클라이언트 오류
+        logger.info(f"Could not decode uploaded image {upload.filename}: {e}")
+        raise ReformGuideError("Image could not be decoded.", status.HTTP_400_BAD_REQUEST)
+    except InferenceNotReady as e:
+        logger.warning(f"Reform guide requested before inference is ready: {e}")
+        raise ReformGuideError("Inference is not ready yet.", status.HTTP_503_SERVICE_UNAVAILABLE)
+    except asyncio.TimeoutError as e:
+        logger.error(f"Error occurred while running YOLO model: {e}")
+        raise ReformGuideError("Inference timed out.", status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        logger.error(f"Error occurred while running YOLO model: {e}")
+        raise ReformGuideError("Error while running YOLO model.")
+
+    try:
+        # 이미지 저장 경로 설정 (같은 내용의 이미지는 같은 파일을 사용)
+        extension = os.path.splitext(upload.filename or "")[1].lower()
+        file_location = f"images/{content_hash}{extension}"
+        if not os.path.exists(file_location):
+            upload.persist(file_location)
+        else:
+            upload.discard()
+    except Exception as e:
+        logger.error(f"Error occurred while saving the image: {e}")
+        raise ReformGuideError("Error while saving the image.")
+
+    return file_location, cloth_type
+
+# 카탈로그에서 리폼 가이드를 찾고, 이미지와 로그 정보, 옷 종류 카운터를 한 트랜잭션으로 DB에 저장
+# 실패하면 롤백하고, 이 요청이 새로 저장한 이미지 파일을 다른 행이 참조하지 않으면 지운다
+async def save_reform_guide(db: AsyncSession, user_id: int, upload: IngestedUpload, file_location: str, cloth_type: str):
+    image_data = ImageCreate(
+        fileName=upload.filename,
+        contentType=upload.content_type,
+        path=file_location
+    )
+    try:
+        guide = await guide_catalog.resolve(db, DEFAULT_REFORM_TYPE, cloth_type)
+        await create_image_log(db, image_data, user_id, guide.guideId, guide.cloth)
+        read_router.mark_write(user_id)
+        return guide
+    except Exception as e:
+        logger.error(f"Error occurred while saving reform guide to the DB: {e}")
+        await db.rollback()
+        try:
+            if upload.created and not await image_path_in_use(db, file_location):
+                upload.remove_created()
+        except Exception as cleanup_error:
+            logger.error(f"Error occurred while removing the saved image: {cleanup_error}")
+        raise ReformGuideError("Error while saving reform guide to the DB.")
+
+# 업로드를 임시 파일로 받는다. 크기/형식 제한에 걸리면 해당 상태 코드로 실패
+async def ingest_image(image: UploadFile) -> IngestedUpload:
+    try:
+        return await ingest_upload(image)
+    except UploadRejected as e:
+        raise ReformGuideError(e.message, e.status_code)
+    except Exception as e:
+        logger.error(f"Error occurred while saving the image: {e}")
+        raise ReformGuideError("Error while saving the image.")
+
+# 비동기 모드로 요청된 리폼 가이드 생성 작업
+async def run_reform_guide_job(user_id: int, upload: IngestedUpload):
+    try:
+        async with AsyncSessionLocal() as job_db:
+            file_location, cloth_type = await detect_cloth(job_db, upload, StageTimer())
+            new_reform = await save_reform_guide(job_db, user_id, upload, file_location, cloth_type)
+        return {
+            "message": "리폼 가이드가 성공적으로 생성되었습니다.",
+            "cloth": new_reform.cloth
+        }
+    except ReformGuideError as e:
+        raise JobFailed(e.message, e.status_code)
+    finally:
+        upload.discard()
+
+# 요청한 사용자의 작업만 조회할 수 있다
+async def get_owned_job(job_id: str, user_id: int):
+    job = await job_queue.get(job_id)
+    if job is None or job["userId"] != user_id:
+        return None
+    return job
+
+def job_content(job: dict) -> dict:
+    return {"jobId": job["jobId"], "status": job["status"], "result": job["result"]}
+
+# 결과 캐시 적중률 조회
+@router.get("/reform-guide/cache", status_code=status.HTTP_200_OK)
+async def get_reform_guide_cache_stats():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={**result_cache.stats(), "catalog": guide_catalog.stats()}
+    )
+
 @router.post("/reform-guide", status_code=status.HTTP_201_CREATED)
 async def create_reform_guide(
-    image: UploadFile = File(None), 
-    access: str = Header(None),
-    db: Session = Depends(get_db)
+    image: UploadFile = File(None),
+    principal: Principal = Depends(get_current_principal),
+    mode: str = Query(default=None),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not access:
-        return JSONResponse(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            content={"errorMessage": "Access token is null."}
-        )
+    user_id = principal.userId
+
+    upload = None
+    timer = StageTimer()
     try:
-        try:
-            # Access token 검증
-            payload = decode_access_token(access)
-            if payload is None:
+        with timer.stage("ingest"):
+            upload = await ingest_image(image)
+
+        # 비동기 모드: 작업을 큐에 넣고 바로 작업 id 를 돌려준다
+        if mode == "async":
+            try:
+                job_id = await job_queue.submit(user_id, run_reform_guide_job, user_id, upload, discard=upload.discard)
+            except JobQueueFull:
                 return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"errorMessage": "Invalid access token"}
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    content={"errorMessage": "Too many pending reform guide jobs."},
+                    headers={"Retry-After": "1"}
                 )
-        except Exception as e:
-            logger.error(f"Error occurred during token verification: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error during token verification."}
-            )
-
-        try:
-            user_id = get_user_by_loginId(db, payload["sub"]).userId
-        except Exception as e:
-            logger.error(f"Error occurred while fetching user by loginId: {e}")
+            upload = None  # 업로드 파일 정리는 작업이 담당
             return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while fetching user information."}
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"jobId": job_id, "status": QUEUED},
+                headers={"Location": f"/reform-guide/jobs/{job_id}"}
             )
-        
-        try:
-            # 이미지 데이터 읽기
-            image_bytes = await image.read()
 
-            # 이미지 저장 경로 설정
-            file_location = f"images/{image.filename}"
-            with open(file_location, "wb") as file:
-                file.write(image_bytes)
-        except Exception as e:
-            logger.error(f"Error occurred while saving the image: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while saving the image."}
-            )
+        file_location, cloth_type = await detect_cloth(db, upload, timer)
+        with timer.stage("db"):
+            new_reform = await save_reform_guide(db, user_id, upload, file_location, cloth_type)
 
-        try:
-            # 이미지 정보 DB에 저장
-            image_data = ImageCreate(
-                fileName=image.filename,
-                contentType=image.content_type,
-                path=file_location
-            )
-            new_image = create_image(db, image_data, user_id)
-        except Exception as e:
-            logger.error(f"Error occurred while saving image information to the DB: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while saving image information to the DB."}
-            )
-        
-        try:
-            # yolo 모델 사용 코드 --------------------------------
-            image_pil = Image.open(io.BytesIO(image_bytes))
-            results = model.predict(image_pil)
-            for result in results:
-                boxes = result.boxes.data.cpu().numpy()
-                for box in boxes:
-                    x1, y1, x2, y2, score, class_id = box
-                    class_name = model.names[int(class_id)]
-                    print(f"Detected {class_name} with confidence {score:.2f}. filename: {image.filename}")
-                    logger.debug(f"Detected {class_name} with confidence {score:.2f}")
-                    cloth_type = class_name
-            # ----------------------------------------------------
-        except Exception as e:
-            logger.error(f"Error occurred while running YOLO model: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while running YOLO model."}
-            )
-        
-        try:
-            # 리폼 가이드 생성
-            reform_data = ReformCreate(
-                reformType="example_reform_type",
-                cloth=cloth_type,
-                fileName=image.filename,
-                contentType=image.content_type,
-                path=file_location
-            )
-            new_reform = create_reform(db, reform_data)
-        except Exception as e:
-            logger.error(f"Error occurred while creating reform guide: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while creating reform guide."}
-            )
-        
-        try:
-            # 로그 정보 DB에 저장
-            log_data = LogCreate(
-                userId=user_id,
-                imageId=new_image.imageId,
-                guideId=new_reform.guideId
-            )
-            new_log = create_log(db, log_data, user_id, new_image.imageId, new_reform.guideId)
-        except Exception as e:
-            logger.error(f"Error occurred while saving log information to the DB: {e}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"errorMessage": "Error while saving log information to the DB."}
-            )
-        
         return JSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={
                 "message": "리폼 가이드가 성공적으로 생성되었습니다.",
                 "cloth": new_reform.cloth
-            }
+            },
+            headers={"Server-Timing": timer.header()}
+        )
+
+    except ReformGuideError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"errorMessage": e.message}
         )
-    
+
     except Exception as e:
         logger.error(f"Error occurred while creating reform guide: {e}")
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errorMessage": "Server error."}
-        )
\ No newline at end of file
+        )
+
+    finally:
+        if upload is not None:
+            upload.discard()
+
+# 여러 이미지를 한 번에 받아 완료되는 순서대로 이미지별 결과를 NDJSON 으로 전송
+@router.post("/reform-guide/batch", status_code=status.HTTP_200_OK)
+async def create_reform_guide_batch(
+    images: List[UploadFile] = File(None),
+    principal: Principal = Depends(get_current_principal)
+):
+    user_id = principal.userId
+
+    if not images:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"errorMessage": "images is a required field."}
+        )
+
+    # 응답 스트리밍 중에는 업로드 파일이 닫힐 수 있으므로 먼저 임시 파일로 받아 둔다
+    uploads = []
+    timers = []
+    for image in images:
+        timer = StageTimer()
+        timers.append(timer)
+        try:
+            with timer.stage("ingest"):
+                uploads.append((image.filename, await ingest_image(image), None))
+        except ReformGuideError as e:
+            uploads.append((image.filename, None, e.message))
+
+    def discard_uploads():
+        for _, upload, _ in uploads:
+            if upload is not None:
+                upload.discard()
+
+    # 하나의 AsyncSession 을 여러 태스크가 동시에 쓸 수 없으므로 이미지마다 세션을 따로 연다
+    # 동시에 검출하는 이미지 수는 REFORM_GUIDE_BATCH_CONCURRENCY 로 제한
+    slots = asyncio.Semaphore(max(1, REFORM_GUIDE_BATCH_CONCURRENCY))
+
+    async def process(index: int):
+        filename, upload, error_message = uploads[index]
+        if upload is None:
+            return index, None, error_message
+        try:
+            async with slots, AsyncSessionLocal() as task_db:
+                return index, await detect_cloth(task_db, upload, timers[index]), None
+        except ReformGuideError as e:
+            return index, None, e.message
+        except Exception as e:
+            logger.error(f"Error occurred while creating reform guide: {e}")
+            return index, None, "Server error."
+
+    async def stream_results():
+        # 요청 스코프의 세션은 응답 전에 닫히므로 스트림 전용 세션을 사용 (결과 저장은 한 번에 하나씩)
+        stream_db = AsyncSessionLocal()
+        tasks = [asyncio.create_task(process(index)) for index in range(len(uploads))]
+        try:
+            # 추론이 끝난 이미지부터 DB 에 저장하는 동안 나머지 이미지의 추론은 계속 진행된다
+            for finished in asyncio.as_completed(tasks):
+                index, detected, error_message = await finished
+                filename, upload, _ = uploads[index]
+                line = {"index": index, "fileName": filename}
+                if detected is not None:
+                    try:
+                        file_location, cloth_type = detected
+                        with timers[index].stage("db"):
+                            new_reform = await save_reform_guide(stream_db, user_id, upload, file_location, cloth_type)
+                        line["cloth"] = new_reform.cloth
+                    except ReformGuideError as e:
+                        error_message = e.message
+                if error_message is not None:
+                    line["errorMessage"] = error_message
+                line["timings"] = timers[index].as_dict()
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            await stream_db.close()
+            discard_uploads()
+
+    return StreamingResponse(
+        stream_results(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(discard_uploads)
+    )
+
+# 비동기 리폼 가이드 작업 상태 조회
+@router.get("/reform-guide/jobs/{job_id}", status_code=status.HTTP_200_OK)
+async def get_reform_guide_job(job_id: str, principal: Principal = Depends(get_current_principal)):
+    user_id = principal.userId
+
+    job = await get_owned_job(job_id, user_id)
+    if job is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"errorMessage": "Job not found."}
+        )
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=job_content(job)
+    )
+
+# 비동기 리폼 가이드 작업 상태를 server-sent events 로 구독
+@router.get("/reform-guide/jobs/{job_id}/events", status_code=status.HTTP_200_OK)
+async def stream_reform_guide_job(job_id: str, principal: Principal = Depends(get_current_principal)):
+    user_id = principal.userId
+
+    if await get_owned_job(job_id, user_id) is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"errorMessage": "Job not found."}
+        )
+
+    async def events():
+        async for job in job_queue.watch(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {job['status']}\ndata: {json.dumps(job_content(job), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,12 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import JSONResponse
-from core.security import decode_access_token, create_access_token
-from crud import get_user_by_loginId, update_user_disabilities, get_user_logs
+from core.auth import Principal, get_current_principal, get_principal_with_refresh
+from crud_async import get_user, update_user_name as update_username, update_user_disabilities, get_user_log_feed, get_wardrobe_stats
 from database import get_db
-from datetime import timedelta
+from core.replica import read_router, get_user_read_db
 from schemas import NameUpdateRequest, DisabilityUpdateRequest
 
 router = APIRouter()
@@ -15,53 +15,21 @@ router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# /user/log 한 페이지의 기본/최대 로그 수
+USER_LOG_PAGE_SIZE = 20
+USER_LOG_MAX_PAGE_SIZE = 100
+
+# refresh 토큰으로 access 토큰을 새로 발급한 경우 응답 헤더로 전달
+def refreshed_headers(principal: Principal):
+    if principal.refreshedAccess is None:
+        return None
+    return {"access": principal.refreshedAccess}
+
 # 회원 정보 조회
 @router.get("/user", status_code=status.HTTP_200_OK)
-async def get_user_info(access: str = Header(None), refresh: str = Header(None), db: Session = Depends(get_db)):
-    if not access:
-        # 액세스 토큰이 없는 경우
-        if not refresh:
-            # 리프레시 토큰도 없는 경우
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"errorMessage": "access 토큰과 refresh 토큰이 없습니다."}
-            )
-        else:
-            # 리프레시 토큰이 있는 경우
-            new_access_token = refresh_access_token(refresh, db)
-            if new_access_token is None:
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"errorMessage": "refresh 토큰이 유효하지 않습니다."}
-                )
-            access = new_access_token  # 새로운 액세스 토큰으로 대체
-
+async def get_user_info(principal: Principal = Depends(get_principal_with_refresh), db: AsyncSession = Depends(get_user_read_db)):
     try:
-        payload = decode_access_token(access)
-        if payload is None:
-            # 액세스 토큰이 만료된 경우
-            if not refresh:
-                # 리프레시 토큰이 없는 경우
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"errorMessage": "access 토큰이 만료되었고 refresh 토큰이 없습니다."}
-                )
-            else:
-                # 리프레시 토큰이 있는 경우
-                new_access_token = refresh_access_token(refresh, db)
-                if new_access_token is None:
-                    return JSONResponse(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        content={"errorMessage": "refresh 토큰이 유효하지 않습니다."}
-                    )
-                access = new_access_token  # 새로운 액세스 토큰으로 대체
-                return JSONResponse(
-                    status_code=status.HTTP_200_OK,
-                    content=user_info,
-                    headers={"access": new_access_token}
-                )
-
-        user = get_user_by_loginId(db, payload["sub"])
+        user = await get_user(db, principal.userId)
         if user is None:
             return JSONResponse(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -75,7 +43,8 @@ async def get_user_info(access: str = Header(None), refresh: str = Header(None),
         }
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content=user_info
+            content=user_info,
+            headers=refreshed_headers(principal)
         )
 
     except Exception as e:
@@ -85,105 +54,50 @@ async def get_user_info(access: str = Header(None), refresh: str = Header(None),
             content={"errorMessage": "Server error."}
         )
 
-def refresh_access_token(refresh_token: str, db: Session):
-    try:
-        payload = decode_access_token(refresh_token)
-        if payload is None:
-            return None
-
-        user = get_user_by_loginId(db, payload["sub"])
-        if user is None:
-            return None
-
-        access_token_expires = timedelta(minutes=30)
-        new_access_token = create_access_token(
-            data={"sub": user.loginId}, expires_delta=access_token_expires
-        )
-
-        return new_access_token
-
-    except Exception as e:
-        logger.error(f"Error occurred during access token refresh: {e}")
-        return None
-    
 # 사용자 이름 변경
 @router.put("/user/name", status_code=status.HTTP_200_OK)
-async def update_user_name(request: NameUpdateRequest, access: str = Header(None), db: Session = Depends(get_db)):
-    if not access:
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={"errorMessage": "Access token is null."}
-        )
-    
+async def update_user_name(request: NameUpdateRequest, principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     try:
-        payload = decode_access_token(access)
-        if payload is None:
+        if not request.name:
             return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"errorMessage": "Access token has expired"}
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"errorMessage": "Name cannot be null or empty"}
             )
 
-        user = get_user_by_loginId(db, payload["sub"])
+        # 이름 업데이트
+        user = await update_username(db, principal.userId, request.name)
+        read_router.mark_write(principal.userId)
         if user is None:
             return JSONResponse(
                 status_code=status.HTTP_403_FORBIDDEN,
                 content={"errorMessage": "Invalid access token"}
             )
-        
-        if not request.name:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"errorMessage": "Name cannot be null or empty"}
-            )
-        
-        # 이름 업데이트
-        user.username = request.name
-        db.commit()
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"message": "Name updated successfully"}
         )
-    
+
     except Exception as e:
         logger.error(f"Error occurred while updating name: {e}")
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errorMessage": "Server error."}
         )
-        
+
 # disability 변경
 @router.put("/user/disability", status_code=status.HTTP_200_OK)
-async def update_disabilities(request: DisabilityUpdateRequest, access: str = Header(None), db: Session = Depends(get_db)):
-    if not access:
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={"errorMessage": "Access token is null."}
-        )
-    
+async def update_disabilities(request: DisabilityUpdateRequest, principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     try:
-        payload = decode_access_token(access)
-        if payload is None:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"errorMessage": "Access token has expired"}
-            )
-
-        user = get_user_by_loginId(db, payload["sub"])
-        if user is None:
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"errorMessage": "Invalid access token"}
-            )
-        
         # 장애 목록 업데이트
-        update_user_disabilities(db, user.userId, request.disabilities)
-        
+        await update_user_disabilities(db, principal.userId, request.disabilities)
+        read_router.mark_write(principal.userId)
+
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"message": "Disabilities updated successfully"}
         )
-    
+
     except ValidationError as e:
         error_messages = e.errors()
         errors = [item['loc'][0] for item in error_messages]
@@ -191,77 +105,36 @@ async def update_disabilities(request: DisabilityUpdateRequest, access: str = He
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"errorMessage": f"{errors} is a required field."}
         )
-    
+
     except Exception as e:
         logger.error(f"Error occurred while updating disabilities: {e}")
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errorMessage": "Server error."}
         )
-        
-@router.get("/user/log", status_code=status.HTTP_200_OK)
-async def get_user_info(access: str = Header(None), refresh: str = Header(None), db: Session = Depends(get_db)):
-    if not access:
-        # 액세스 토큰이 없는 경우
-        if not refresh:
-            # 리프레시 토큰도 없는 경우
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"errorMessage": "access 토큰과 refresh 토큰이 없습니다."}
-            )
-        else:
-            # 리프레시 토큰이 있는 경우
-            new_access_token = refresh_access_token(refresh, db)
-            if new_access_token is None:
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"errorMessage": "refresh 토큰이 유효하지 않습니다."}
-                )
-            access = new_access_token  # 새로운 액세스 토큰으로 대체
 
+# 사용자 로그 조회. 최신순으로 limit 개씩, 다음 페이지는 응답의 nextCursor 를 cursor 로 넘겨 조회
+@router.get("/user/log", status_code=status.HTTP_200_OK)
+async def get_user_log(
+    cursor: int = Query(default=None),
+    limit: int = Query(default=USER_LOG_PAGE_SIZE),
+    principal: Principal = Depends(get_principal_with_refresh),
+    db: AsyncSession = Depends(get_user_read_db)
+):
     try:
-        payload = decode_access_token(access)
-        if payload is None:
-            # 액세스 토큰이 만료된 경우
-            if not refresh:
-                # 리프레시 토큰이 없는 경우
-                return JSONResponse(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    content={"errorMessage": "access 토큰이 만료되었고 refresh 토큰이 없습니다."}
-                )
-            else:
-                # 리프레시 토큰이 있는 경우
-                new_access_token = refresh_access_token(refresh, db)
-                if new_access_token is None:
-                    return JSONResponse(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        content={"errorMessage": "refresh 토큰이 유효하지 않습니다."}
-                    )
-                access = new_access_token  # 새로운 액세스 토큰으로 대체
-                return JSONResponse(
-                    status_code=status.HTTP_200_OK,
-                    headers={"access": new_access_token}
-                )
-        user = get_user_by_loginId(db, payload["sub"])
-        if user is None:
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"errorMessage": "access 토큰이 유효하지 않습니다."}
-            )
-        logger.debug("login success")
-        # 사용자 로그 조회
-        logs = get_user_logs(db, user.userId)
-        log_data = []
-        for log in logs:
-            log_entry = {
-                "imagePath": log.logImage.path,
-                "imageCloth": log.logReform.cloth
-            }
-            log_data.append(log_entry)
+        limit = max(1, min(limit, USER_LOG_MAX_PAGE_SIZE))
+        # 다음 페이지가 있는지 알기 위해 하나 더 조회
+        rows = await get_user_log_feed(db, principal.userId, cursor, limit + 1)
+        log_data = [
+            {"imagePath": path, "imageCloth": cloth}
+            for _, path, cloth in rows[:limit]
+        ]
+        next_cursor = rows[limit - 1].logId if len(rows) > limit else None
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content={"logs": log_data}
+            content={"logs": log_data, "nextCursor": next_cursor},
+            headers=refreshed_headers(principal)
         )
 
     except Exception as e:
@@ -269,4 +142,24 @@ async def get_user_info(access: str = Header(None), refresh: str = Header(None),
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errorMessage": "Server error."}
-        )
\ No newline at end of file
+        )
+
+# 옷 종류별 검출 횟수 조회. 로그를 읽지 않고 사용자별 카운터만 읽는다
+@router.get("/user/stats", status_code=status.HTTP_200_OK)
+async def get_user_stats(principal: Principal = Depends(get_principal_with_refresh), db: AsyncSession = Depends(get_user_read_db)):
+    try:
+        rows = await get_wardrobe_stats(db, principal.userId)
+        stats = [{"cloth": cloth, "count": count} for cloth, count in rows]
+
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"stats": stats, "total": sum(stat["count"] for stat in stats)},
+            headers=refreshed_headers(principal)
+        )
+
+    except Exception as e:
+        logger.error(f"Error occurred during user stats retrieval: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"errorMessage": "Server error."}
+        )
@@ -41,9 +41,7 @@ class LoginRequest(BaseModel):
 class ReformBase(BaseModel):
     reformType: str
     cloth: str
-    fileName: str
-    contentType: str
-    path: str
+    disabilityProfile: str = ""
 
 class ReformCreate(ReformBase):
     pass
@@ -0,0 +1,56 @@
+import argparse
+import time
+from sqlalchemy.exc import IntegrityError, OperationalError
+from crud import get_user_ids_after, count_user_clothes, replace_wardrobe_stats
+from database import SessionLocal
+
+# 남아 있는 로그로 wardrobeStat 카운터를 다시 만든다. 사용자 id 순으로 batch-size 명씩 처리
+#
+#   python -m scripts.backfill_wardrobe_stats --batch-size 500
+#
+# 사용자 묶음마다 세기와 바꾸기를 한 SERIALIZABLE 트랜잭션으로 실행하므로 API 가 같은 사용자의 카운터를
+# 동시에 늘리면 (직렬화 충돌, 또는 API 가 먼저 만든 카운터 행과의 중복 키) 해당 묶음만 다시 시도한다
+# scripts/retention.py 로 보관한 로그는 세지 않는다 (보관 이후에 실행하면 그만큼 횟수가 줄어든다)
+
+# 직렬화 충돌이나 중복 키로 한 묶음을 다시 시도하는 최대 횟수
+MAX_ATTEMPTS = 5
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild per-user wardrobe counters from the log table.")
+    parser.add_argument("--batch-size", type=int, default=500, help="users per transaction")
+    parser.add_argument("--after-user-id", type=int, default=0, help="resume after this userId")
+    return parser.parse_args()
+
+def rebuild_batch(user_ids: list) -> int:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        with SessionLocal() as db:
+            try:
+                db.connection(execution_options={"isolation_level": "SERIALIZABLE"})
+                counts = count_user_clothes(db, user_ids)
+                replace_wardrobe_stats(db, user_ids, counts)
+                db.commit()
+                return len(counts)
+            except (OperationalError, IntegrityError):
+                db.rollback()
+                if attempt == MAX_ATTEMPTS:
+                    raise
+        time.sleep(0.1 * attempt)
+
+def main():
+    args = parse_args()
+    after_user_id = args.after_user_id
+    users = counters = 0
+    started = time.perf_counter()
+    while True:
+        with SessionLocal() as db:
+            user_ids = get_user_ids_after(db, after_user_id, max(1, args.batch_size))
+        if not user_ids:
+            break
+        counters += rebuild_batch(user_ids)
+        users += len(user_ids)
+        after_user_id = user_ids[-1]
+        print(f"Rebuilt {users} users, {counters} counters (last userId {after_user_id})")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+import httpx
+
+# 로컬 DB 로 main.py 의 앱을 띄우고 엔드포인트별 처리량과 지연 시간을 측정한다
+#
+#   python -m scripts.benchmark --concurrency 16 --requests 200 --output bench_results.json
+#   python -m scripts.benchmark --model real --baseline bench_results.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for the FastAPI app.")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub", help="stub model or routers/best.pt")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0, help="forward pass latency of the stub model")
+    parser.add_argument("--database-url", default=None, help="database for the app (default: a temporary sqlite file)")
+    parser.add_argument("--image", default=os.path.join(ROOT, "images", "test_cloth.png"), help="image uploaded to /reform-guide")
+    parser.add_argument("--port", type=int, default=0, help="port for the app (default: a free port)")
+    parser.add_argument("--endpoints", default="signup,signin,user,user/log,reform-guide,reform-guide-cached", help="comma separated endpoints")
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable result file")
+    parser.add_argument("--baseline", default=None, help="previous result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 / throughput regression ratio")
+    return parser.parse_args()
+
+def percentile(values, ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(ratio * (len(ordered) - 1))))
+    return ordered[index]
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = [sample["latency"] for sample in samples]
+    errors = [sample for sample in samples if sample["status"] >= 400]
+    stages = {}
+    for sample in samples:
+        for name, duration in sample["stages"].items():
+            stages.setdefault(name, []).append(duration)
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "statusCodes": {str(code): sum(1 for sample in samples if sample["status"] == code) for code in sorted({s["status"] for s in samples})},
+        "throughput": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latencyMs": {
+            "mean": round(statistics.mean(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(max(latencies), 2) if latencies else 0.0
+        },
+        "stagesMs": {
+            name: {"mean": round(statistics.mean(values), 2), "p95": round(percentile(values, 0.95), 2)}
+            for name, values in stages.items()
+        }
+    }
+
+async def run_load(client: httpx.AsyncClient, concurrency: int, total: int, make_request):
+    samples = []
+    counter = iter(range(total))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(index)
+                status, timing = response.status_code, response.headers.get("server-timing")
+            except httpx.HTTPError:
+                status, timing = 599, None
+            samples.append({
+                "latency": (time.perf_counter() - started) * 1000,
+                "status": status,
+                "stages": parse_server_timing(timing)
+            })
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(samples, time.perf_counter() - started)
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 300.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The app exited before becoming ready.")
+        try:
+            # 다른 프로세스가 같은 포트에서 응답하고 있으면 엉뚱한 서버를 측정하게 되므로 중단
+            pid = (await client.get("/health")).json().get("pid")
+            if pid != process.pid:
+                raise RuntimeError(f"Another process (pid {pid}) is answering on the benchmark port.")
+            response = await client.get("/health/ready")
+            if response.status_code == 200:
+                return
+            if response.json()["inference"]["status"] == "failed":
+                raise RuntimeError(f"Inference failed to start: {response.text}")
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("The app did not become ready in time.")
+
+async def benchmark(args, base_url: str, process: subprocess.Popen) -> dict:
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    with open(args.image, "rb") as file:
+        image_bytes = file.read()
+    image_type = "image/png" if args.image.lower().endswith(".png") else "image/jpeg"
+    prefix = uuid.uuid4().hex[:6]
+    password = "benchmark-password"
+    results = {}
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        await wait_until_ready(client, process)
+
+        # 측정에 쓸 사용자. signup 을 측정하지 않아도 한 명은 만든다
+        async def signup(index: int):
+            return await client.post("/signup", json={
+                "loginId": f"{prefix}{index}",
+                "password": password,
+                "name": f"bench-{prefix}-{index}",
+                "disabilities": ["visual", "hearing"]
+            })
+
+        if "signup" in endpoints:
+            results["signup"] = await run_load(client, args.concurrency, args.requests, signup)
+        else:
+            await signup(0)
+
+        async def signin(index: int):
+            return await client.post("/signin", json={"loginId": f"{prefix}0", "password": password})
+
+        response = await signin(0)
+        access = response.headers.get("access")
+        if access is None:
+            raise RuntimeError(f"Sign in failed: {response.status_code} {response.text}")
+        headers = {"access": access}
+
+        if "signin" in endpoints:
+            results["signin"] = await run_load(client, args.concurrency, args.requests, signin)
+
+        # reform-guide: 요청마다 내용이 다른 이미지를 올려 결과 캐시를 거치지 않고 디코딩/추론까지 측정
+        # (PNG/JPEG 디코더는 이미지 끝 뒤의 바이트를 무시하므로 뒤에 요청 번호를 붙인다)
+        async def reform_guide(index: int):
+            unique_bytes = image_bytes + f"bench-{prefix}-{index}".encode()
+            return await client.post(
+                "/reform-guide",
+                headers=headers,
+                files={"image": (f"bench-{index}.png", unique_bytes, image_type)}
+            )
+
+        # reform-guide-cached: 같은 이미지를 반복해서 올려 캐시 적중 경로를 측정
+        async def reform_guide_cached(index: int):
+            return await client.post(
+                "/reform-guide",
+                headers=headers,
+                files={"image": ("bench-cached.png", image_bytes, image_type)}
+            )
+
+        # 측정이 끝난 시점의 결과 캐시 통계를 함께 기록
+        async def attach_cache_stats(name: str):
+            cache = await client.get("/reform-guide/cache")
+            if cache.status_code == 200:
+                results[name]["cache"] = cache.json()
+
+        # /user/log 가 비어 있지 않도록 reform-guide 를 먼저 측정
+        if "reform-guide" in endpoints:
+            results["reform-guide"] = await run_load(client, args.concurrency, args.requests, reform_guide)
+            await attach_cache_stats("reform-guide")
+
+        if "reform-guide-cached" in endpoints:
+            # 캐시를 채우는 첫 요청은 측정에서 뺀다
+            await reform_guide_cached(-1)
+            results["reform-guide-cached"] = await run_load(client, args.concurrency, args.requests, reform_guide_cached)
+            await attach_cache_stats("reform-guide-cached")
+
+        if "user" in endpoints:
+            results["user"] = await run_load(client, args.concurrency, args.requests, lambda index: client.get("/user", headers=headers))
+
+        if "user/log" in endpoints:
+            results["user/log"] = await run_load(client, args.concurrency, args.requests, lambda index: client.get("/user/log", headers=headers))
+
+
+    return results
+
+# 기준 결과보다 p95 가 늘거나 처리량이 줄어든 엔드포인트를 찾는다
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        if current["latencyMs"]["p95"] > previous["latencyMs"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['latencyMs']['p95']}ms -> {current['latencyMs']['p95']}ms")
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput']}/s -> {current['throughput']}/s")
+    return regressions
+
+def app_env(args, database_url: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DB_URL": database_url,
+        "JWT_KEY": env.get("JWT_KEY") or "benchmark-secret",
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "REVOCATION_DB_PATH": os.path.join(workdir, "revoked_tokens.sqlite3"),
+        "INFERENCE_BACKEND": "stub" if args.model == "stub" else env.get("INFERENCE_BACKEND", "torch"),
+        "INFERENCE_STUB_LATENCY_MS": str(args.stub_latency_ms),
+        # 한 IP, 한 계정으로 부하를 주므로 요청 수 제한은 끈다
+        "ADMISSION_IP_RATE": env.get("ADMISSION_IP_RATE", "0"),
+        "ADMISSION_LOGIN_RATE": env.get("ADMISSION_LOGIN_RATE", "0"),
+        # 해시 동시 실행 제한은 유지하되 측정 중인 요청은 거절하지 않고 기다리게 한다
+        "ADMISSION_HASH_QUEUE": env.get("ADMISSION_HASH_QUEUE", str(args.concurrency)),
+        "ADMISSION_HASH_WAIT": env.get("ADMISSION_HASH_WAIT", "60")
+    })
+    return env
+
+# 앱은 스키마가 최신이 아니면 시작하지 않으므로 먼저 마이그레이션을 적용
+def migrate(env: dict):
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, env=env, check=True)
+
+# 지정한 포트가 비어 있는지 확인하고, 0 이면 빈 포트를 고른다
+def free_port(port: int) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            raise SystemExit(f"Port {port} is already in use.")
+        return sock.getsockname()[1]
+
+def start_app(args, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env
+    )
+
+def main():
+    args = parse_args()
+    args.port = free_port(args.port)
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+        env = app_env(args, database_url, workdir)
+        migrate(env)
+        # reform-guide 는 요청마다 다른 이미지를 올리므로 측정이 끝나면 새로 생긴 파일을 지운다
+        images_dir = os.path.join(ROOT, "images")
+        existing = set(os.listdir(images_dir)) if os.path.isdir(images_dir) else set()
+        process = start_app(args, env)
+        try:
+            results = asyncio.run(benchmark(args, f"http://127.0.0.1:{args.port}", process))
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            if args.database_url is None and os.path.isdir(images_dir):
+                for name in set(os.listdir(images_dir)) - existing:
+                    os.remove(os.path.join(images_dir, name))
+
+    report = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "model": args.model,
+            "stubLatencyMs": args.stub_latency_ms if args.model == "stub" else None,
+            "database": "sqlite" if args.database_url is None else args.database_url.split(":", 1)[0],
+            "python": platform.python_version(),
+            "cpus": os.cpu_count()
+        },
+        "endpoints": results
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+
+    for name, result in results.items():
+        latency = result["latencyMs"]
+        print(f"{name:20} {result['throughput']:8.1f} req/s  p50 {latency['p50']:8.1f}ms  p95 {latency['p95']:8.1f}ms  p99 {latency['p99']:8.1f}ms  errors {result['errors']}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
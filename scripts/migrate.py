@@ -0,0 +1,26 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from core.schema import ALEMBIC_INI, current_revisions
+from database import engine
+
+# 컨테이너 시작 시 `alembic upgrade head` 대신 실행한다
+#
+#   python -m scripts.migrate
+#
+# alembic 도입 전 create_all 로 만든 DB 는 버전 정보 없이 테이블만 있어서 upgrade 가 0001 의
+# CREATE TABLE 에서 실패한다. 그런 DB 는 먼저 0001 (create_all 과 같은 스키마) 로 표시한 뒤 upgrade 한다
+
+# create_all 로 만든 DB 인지 판단하는 테이블
+BASELINE_TABLE = "user"
+BASELINE_REVISION = "0001"
+
+def main():
+    config = Config(ALEMBIC_INI)
+    if not current_revisions(engine) and inspect(engine).has_table(BASELINE_TABLE):
+        print(f"Existing tables without a schema revision, stamping {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import tarfile
+import tempfile
+from datetime import datetime, timezone
+from crud import (
+    get_oldest_log_created_at, get_logs_created_between, delete_logs_created_between, get_log_image_ids,
+    get_images_by_ids, get_image_paths_in_use, delete_images
+)
+from database import SessionLocal
+from core.partitions import (
+    month_start, add_months, log_partition_name, supports_partitions, ensure_log_partitions,
+    list_log_partitions, drop_log_partition
+)
+
+# 보관 기간이 지난 log 와 image 행, 이미지 파일을 달마다 tar.gz 로 보관한 뒤 DB 와 디스크에서 지운다
+# 앱과 같은 작업 디렉터리에서 실행한다 (image.path 는 작업 디렉터리 기준 경로)
+#
+#   python -m scripts.retention --keep-months 6 --archive-dir archive
+#   python -m scripts.retention --keep-months 6 --dry-run
+#
+# Postgres 에서는 해당 달의 log 파티션을 떼어 내 삭제하고 앞으로 쓸 파티션을 미리 만든다
+# 다른 DB 에서는 createdAt 범위로 행을 삭제한다
+
+# IN 조건 하나에 넣는 id 수이자 한 번에 읽는 로그 행 수
+BATCH_SIZE = 1000
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive and drop log rows and images older than the retention period.")
+    parser.add_argument("--keep-months", type=int, default=int(os.getenv("LOG_RETENTION_MONTHS", "6")),
+                        help="number of months to keep in the database, including the current month")
+    parser.add_argument("--archive-dir", default=os.getenv("LOG_ARCHIVE_DIR", "archive"), help="directory for the tar.gz archives")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be archived")
+    return parser.parse_args()
+
+def chunks(values: list, size: int = BATCH_SIZE):
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+# 보관 기간이 지난 달 목록 (로그가 있는 달과 남아 있는 파티션의 달)
+def expired_months(db, cutoff: datetime):
+    months = set()
+    oldest = get_oldest_log_created_at(db)
+    if oldest is not None:
+        month = month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = add_months(month, 1)
+    connection = db.connection()
+    if supports_partitions(connection):
+        months.update(month for month, _ in list_log_partitions(connection) if month < cutoff)
+    return sorted(months)
+
+# 한 달치 로그를 logId 순으로 BATCH_SIZE 행씩 읽는다 (한 번에 메모리에 올리지 않는다)
+def iter_logs(db, start: datetime, end: datetime):
+    after_log_id = 0
+    while True:
+        rows = get_logs_created_between(db, start, end, after_log_id, BATCH_SIZE)
+        yield from rows
+        if len(rows) < BATCH_SIZE:
+            return
+        after_log_id = rows[-1].logId
+
+def write_jsonl(file, row: dict):
+    file.write((json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+# 임시 파일에 써 둔 내용을 tar 항목으로 추가
+def add_member(archive: tarfile.TarFile, name: str, file):
+    info = tarfile.TarInfo(name)
+    info.size = file.tell()
+    info.mtime = int(datetime.now(timezone.utc).timestamp())
+    file.seek(0)
+    archive.addfile(info, file)
+
+# 로그, 이미지 행과 이미지 파일을 임시 파일에 쓴 뒤 디스크에 기록되면 이름을 바꾼다
+def write_archive(path: str, log_file, image_file, image_paths: list):
+    temporary = f"{path}.tmp"
+    with tarfile.open(temporary, "w:gz") as archive:
+        add_member(archive, "log.jsonl", log_file)
+        add_member(archive, "image.jsonl", image_file)
+        for image_path in image_paths:
+            if os.path.exists(image_path):
+                archive.add(image_path, arcname=image_path)
+    with open(temporary, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+# 로그와 이미지 행은 묶음 단위로 임시 파일에 써 두고 id 와 경로만 메모리에 남긴다
+def archive_month(month: datetime, args) -> dict:
+    start, end = month, add_months(month, 1)
+    with SessionLocal() as db, tempfile.TemporaryFile() as log_file, tempfile.TemporaryFile() as image_file:
+        logs = 0
+        image_ids = set()
+        for log in iter_logs(db, start, end):
+            logs += 1
+            if log.imageId is not None:
+                image_ids.add(log.imageId)
+            if not args.dry_run:
+                write_jsonl(log_file, log._asdict())
+        image_ids = sorted(image_ids)
+        images = {}
+        for batch in chunks(image_ids):
+            for image in get_images_by_ids(db, batch):
+                images[image.imageId] = image.path
+                if not args.dry_run:
+                    write_jsonl(image_file, {
+                        "imageId": image.imageId,
+                        "userId": image.userId,
+                        "fileName": image.fileName,
+                        "path": image.path,
+                        "contentType": image.contentType,
+                        "createdAt": image.createdAt
+                    })
+            # 읽은 Image 객체가 세션에 쌓이지 않도록 비운다
+            db.expunge_all()
+        summary = {"month": f"{month:%Y-%m}", "logs": logs, "images": len(images), "archive": None}
+        if args.dry_run:
+            return summary
+
+        if logs:
+            os.makedirs(args.archive_dir, exist_ok=True)
+            summary["archive"] = os.path.join(
+                args.archive_dir, f"log-{month:%Y-%m}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.tar.gz"
+            )
+            write_archive(summary["archive"], log_file, image_file, sorted(set(images.values())))
+
+        # 보관 파일을 쓴 뒤에 한 트랜잭션으로 삭제
+        connection = db.connection()
+        partition = log_partition_name(month)
+        if supports_partitions(connection) and partition in {name for _, name in list_log_partitions(connection)}:
+            drop_log_partition(connection, partition)
+        else:
+            delete_logs_created_between(db, start, end)
+        still_used = set()
+        for batch in chunks(image_ids):
+            still_used |= get_log_image_ids(db, batch)
+        removed = [image_id for image_id in image_ids if image_id in images and image_id not in still_used]
+        for batch in chunks(removed):
+            delete_images(db, batch)
+        db.commit()
+
+        # 같은 내용의 이미지는 파일을 공유하므로 더 이상 참조하는 행이 없는 파일만 지운다
+        paths = sorted({images[image_id] for image_id in removed})
+        in_use = set()
+        for batch in chunks(paths):
+            in_use |= get_image_paths_in_use(db, batch)
+        for path in paths:
+            if path not in in_use and os.path.exists(path):
+                os.remove(path)
+        summary["images"] = len(removed)
+    return summary
+
+def main():
+    args = parse_args()
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -(max(1, args.keep_months) - 1))
+
+    with SessionLocal() as db:
+        connection = db.connection()
+        if supports_partitions(connection) and not args.dry_run:
+            ensure_log_partitions(connection)
+            db.commit()
+        months = expired_months(db, cutoff)
+
+    print(f"Keeping logs created since {cutoff:%Y-%m-%d}")
+    for month in months:
+        summary = archive_month(month, args)
+        if not summary["logs"]:
+            continue
+        action = "would archive" if args.dry_run else "archived"
+        print(f"{summary['month']}: {action} {summary['logs']} logs, {summary['images']} images"
+              + (f" -> {summary['archive']}" if summary["archive"] else ""))
+
+if __name__ == "__main__":
+    main()